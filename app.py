@@ -1,25 +1,37 @@
-from flask import Flask, render_template, url_for, flash, redirect, request, send_from_directory, jsonify, session, Response
+from flask import Flask, render_template, url_for, flash, redirect, request, send_from_directory, jsonify, session, Response, stream_with_context, get_flashed_messages
 from flask_login import LoginManager, login_user, current_user, logout_user, login_required
 from werkzeug.utils import secure_filename
-from werkzeug.exceptions import HTTPException
+from werkzeug.security import safe_join
+from werkzeug.exceptions import ClientDisconnected, HTTPException, NotFound
 from datetime import datetime, timedelta
 import os
 import secrets
-import json
-import logging
+import threading
+import time
+from collections import OrderedDict
+import hashlib
+import mimetypes
 import re
-from sqlalchemy.orm import joinedload # NEW: For eager loading in history route
+import shutil
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload, undefer_group
 
 # Import your configuration and database modules
 from config import config
-from database import db, User, Resume, JobDescription, ResumeAnalysis, init_db, get_user_stats
+from logging_config import setup_logging
+from database import db, User, Resume, JobDescription, ResumeAnalysis, init_db, upgrade_schema, get_user_stats, get_rank_fields, hash_content, dump_json, get_content_preview
 from resume_utils import ResumeProcessor, analyze_skill_trends, get_industry_insights
 
 # Import for PDF/CSV generation
 from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+from xml.sax.saxutils import escape
 import csv
 import io
+import numpy as np
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -29,12 +41,39 @@ app_config = config[os.environ.get('FLASK_ENV', 'default')]
 app.config.from_object(app_config)
 
 # Setup logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-logger = logging.getLogger(__name__)
+logger = setup_logging(app)
+logger.debug(f"Database URI set to: {app.config['SQLALCHEMY_DATABASE_URI']}")
+
+# Server-side sessions (optional): only the session id goes in the cookie
+if app.config.get('SESSION_TYPE'):
+    try:
+        from flask_session import Session
+        if app.config['SESSION_TYPE'] == 'redis' and not app.config.get('SESSION_REDIS'):
+            import redis
+            app.config['SESSION_REDIS'] = redis.from_url(app.config['REDIS_URL'])
+        Session(app)
+    except ImportError:
+        logger.warning("Flask-Session or its backend client is not installed. Falling back to cookie sessions.")
+
+# Optional Celery queue so /api/check can hand analyses to dedicated workers
+# (run them with: celery -A app.celery worker)
+celery = None
+if app.config.get('CELERY_BROKER_URL'):
+    try:
+        from celery import Celery
+        celery = Celery(app.import_name, broker=app.config['CELERY_BROKER_URL'], backend=app.config['CELERY_RESULT_BACKEND'])
+    except ImportError:
+        logger.warning("Celery is not installed. /api/check will analyze resumes in the request.")
 
 # Initialize database
 init_db(app)
 
+@app.cli.command('upgrade-db')
+def upgrade_db_command():
+    """Adds new columns and indexes to an existing database and backfills them."""
+    upgrade_schema()
+    print("Database schema is up to date.")
+
 # Setup Flask-Login
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -49,16 +88,549 @@ def load_user(user_id):
 # Create upload folders if they don't exist
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['REPORTS_FOLDER'], exist_ok=True)
+os.makedirs(app.config['TEXT_CACHE_FOLDER'], exist_ok=True)
+
+# Allowed extensions, bound once so allowed_file doesn't go through app.config per upload
+ALLOWED_EXTENSIONS = frozenset(ext.lower() for ext in app.config['ALLOWED_EXTENSIONS'])
 
 # Helper function to check allowed file extensions
 def allowed_file(filename):
     """Checks if a file's extension is allowed."""
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
+    dot = filename.rfind('.')
+    return dot != -1 and filename[dot + 1:].lower() in ALLOWED_EXTENSIONS
 
 # Initialize ResumeProcessor (can be done once globally or per request if stateful)
 resume_processor = ResumeProcessor()
 
+# Background pool for writing accepted uploads, so requests don't wait on disk IO
+upload_write_pool = ThreadPoolExecutor(max_workers=app.config['UPLOAD_WRITE_WORKERS'])
+
+def _write_upload(data, resume_path):
+    """Writes the uploaded bytes to disk, logging rather than raising on failure."""
+    try:
+        with open(resume_path, 'wb') as f:
+            f.write(data)
+    except OSError as e:
+        logger.error(f"Failed to save upload to {resume_path}: {e}")
+
+# Chunk size for copying upload streams to disk
+UPLOAD_COPY_BUFFER_SIZE = 1024 * 1024
+
+# How often /events checks the result backend for task progress
+TASK_EVENTS_POLL_SECONDS = 0.5
+
+# Queued task ids and staged upload ids a session remembers; the default session is a ~4 KB cookie
+SESSION_TASKS_KEPT = 20
+PENDING_UPLOADS_KEPT = 10
+
+# Helper function to record an id in a capped list kept in the session
+def remember_in_session(key, value, keep):
+    """Appends value to session[key], keeping only the newest `keep` entries; returns the ones dropped."""
+    values = session.get(key, []) + [value]
+    session[key] = values[-keep:]
+    return values[:-keep]
+
+# Helper function to write an already-read upload to the uploads folder
+def persist_upload(data, resume_path):
+    """Queues the uploaded bytes to be written to disk so the stored resume can be served later."""
+    upload_write_pool.submit(_write_upload, data, resume_path)
+
+# Helper function to extract resume text, reusing text already parsed from identical files
+def extract_resume_text(data, file_type):
+    """
+    Extracts text from uploaded resume bytes.
+
+    Parsed text is cached on disk under the file's content hash, so re-uploading
+    the same resume skips PDF/DOCX parsing entirely.
+    """
+    file_hash = hashlib.blake2b(data, digest_size=16).hexdigest()
+    cache_path = os.path.join(app.config['TEXT_CACHE_FOLDER'], f"{file_hash}.{file_type.lower()}.txt")
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+
+    resume_text = resume_processor.extract_text_from_stream(io.BytesIO(data), file_type)
+    if resume_text:
+        # Write to a temp file first so concurrent requests never read a partial entry
+        tmp_path = f"{cache_path}.{secrets.token_hex(4)}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(resume_text)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            logger.warning(f"Could not cache extracted text for {file_hash}: {e}")
+    return resume_text
+
+# Helper function to generate unique upload filename prefixes from a single urandom read
+def generate_upload_tokens(count):
+    """Returns `count` random 16-character hex tokens (same format as secrets.token_hex(8))."""
+    raw = os.urandom(8 * count).hex()
+    return [raw[i:i + 16] for i in range(0, len(raw), 16)]
+
+# Helper function to save and parse a single uploaded resume (safe to run on a worker thread)
+def process_uploaded_resume(resume_file, token):
+    """
+    Reads an uploaded resume and extracts its text and features.
+
+    The file is not written yet: it is stored under a `token`-prefixed name once
+    its batch is committed, and only if no resume with the same content exists.
+    Returns (resume_data, None) on success or (None, (message, category)) on failure,
+    leaving it to the caller to flash the message from the request thread.
+    """
+    try:
+        original_filename = secure_filename(resume_file.filename)
+        unique_filename = f"{token}_{original_filename}"
+        resume_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
+        file_type = original_filename.rsplit('.', 1)[1].upper()
+
+        # Read the upload once and parse it from memory; only keep files we could read
+        data = resume_file.read()
+        resume_text = extract_resume_text(data, file_type)
+        if not resume_text:
+            return None, (f'Could not extract text from {original_filename}. Skipping.', 'warning')
+
+        return {
+            'filename': original_filename,
+            'unique_filename': unique_filename,
+            'file_path': resume_path,
+            'file_data': data,
+            'content': resume_text,
+            'content_hash': hash_content(resume_text),
+            'file_size': len(data),
+            'file_type': file_type,
+            'skills': resume_processor.extract_skills(resume_text),
+            'experience': resume_processor.extract_experience(resume_text),
+            'education': resume_processor.extract_education(resume_text),
+            'contact_info': resume_processor.extract_contact_info(resume_text)
+        }, None
+
+    except Exception as e:
+        return None, (f"Error processing {resume_file.filename}: {str(e)}", 'danger')
+
+# Helper function to reject oversized uploads from the Content-Length header alone
+def request_too_large():
+    """True if the declared body size exceeds MAX_CONTENT_LENGTH; checked before the form is parsed."""
+    return (request.content_length or 0) > app.config['MAX_CONTENT_LENGTH']
+
+# Helper function to flash the oversized-upload message
+def flash_request_too_large():
+    """Flashes the upload size limit error."""
+    flash(f"Upload is too large. The maximum total size is {app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)}MB.", 'danger')
+
+# Helper function to validate job description length
+def job_description_too_long(job_description_content):
+    """True (after flashing an error) if the job description exceeds MAX_JOB_DESCRIPTION_LENGTH."""
+    if len(job_description_content) > app.config['MAX_JOB_DESCRIPTION_LENGTH']:
+        flash(f"Job Description is too long. The maximum is {app.config['MAX_JOB_DESCRIPTION_LENGTH']} characters.", 'danger')
+        return True
+    return False
+
+# Helper function to stream a rendered template (Flask 2.0 has no stream_template)
+def stream_template(template_name, **context):
+    """
+    Renders a template as a streamed response so the first chunk goes out
+    before the whole page has been generated.
+    """
+    # The session is saved before a streamed body is generated, so pop flashed
+    # messages now; the template's get_flashed_messages() call reuses them
+    get_flashed_messages()
+    app.update_template_context(context)
+    template = app.jinja_env.get_template(template_name)
+    return Response(stream_with_context(template.generate(**context)))
+
+# Helper function to get job description skills, reusing any earlier extraction of the same text
+def get_job_skills(job_description_content):
+    """
+    Returns the skills required by a job description.
+
+    Checks this process's extraction cache first, then skills saved for an
+    identical JD by any user, so popular job descriptions only go through
+    skill extraction once.
+    """
+    job_skills = resume_processor.get_cached_extraction('extract_skills_deep', job_description_content)
+    if job_skills is not None:
+        return job_skills
+
+    job_skills = JobDescription.find_skills_by_content(job_description_content)
+    if job_skills is not None:
+        # Remember it in-process so repeat submissions skip the database lookup too
+        resume_processor.cache_extraction('extract_skills_deep', job_description_content, job_skills)
+        return job_skills
+
+    return resume_processor.extract_skills_deep(job_description_content)
+
+# Skill trends keyed by the (count, max id) of the job_descriptions table;
+# a new or deleted JD changes the key, so trends are only recomputed then
+TRENDS_CACHE_SIZE = 4
+_trends_cache = OrderedDict()
+_trends_cache_lock = threading.Lock()
+
+# Helper function to get skill trends across every stored job description
+def get_skill_trends():
+    """Returns analyze_skill_trends() over all job descriptions, recomputing only when they change."""
+    signature = tuple(db.session.query(func.count(JobDescription.id), func.max(JobDescription.id)).one())
+    with _trends_cache_lock:
+        if signature in _trends_cache:
+            _trends_cache.move_to_end(signature)
+            return _trends_cache[signature]
+
+    # Read just the stored skills column instead of loading whole JobDescription objects
+    job_skill_sets = [
+        {'job_skills': [skill['skill'] if isinstance(skill, dict) else skill
+                        for skill in JobDescription.decode_skills(skills_required)]}
+        for (skills_required,) in db.session.query(JobDescription.skills_required).yield_per(500)
+    ]
+    skill_trends = analyze_skill_trends(job_skill_sets)
+
+    with _trends_cache_lock:
+        _trends_cache[signature] = skill_trends
+        while len(_trends_cache) > TRENDS_CACHE_SIZE:
+            _trends_cache.popitem(last=False)
+    return skill_trends
+
+# Helper function to look up analyses already stored for resumes against a job description
+def find_saved_analyses(content_hashes, job_desc_db_obj):
+    """
+    Returns {content_hash: (overall_score, matched_skills)} with the current user's latest
+    stored analysis of each resume content against this job description.
+
+    Uses one column-only query, so a repeat comparison skips text analysis entirely.
+    """
+    rows = db.session.query(
+        Resume.content_hash, ResumeAnalysis.overall_score, ResumeAnalysis.matched_skills
+    ).join(ResumeAnalysis.resume).filter(
+        ResumeAnalysis.job_description_id == job_desc_db_obj.id,
+        ResumeAnalysis.user_id == current_user.id,
+        Resume.uploaded_by == current_user.id,
+        Resume.content_hash.in_(content_hashes)
+    ).order_by(ResumeAnalysis.created_at, ResumeAnalysis.id)
+
+    # Later rows overwrite earlier ones, leaving the latest analysis per resume. Scores are
+    # returned as NumPy floats, like fresh ones, so they round the same way for display
+    return {
+        content_hash: (np.float64(overall_score), JobDescription.decode_skills(matched_skills))
+        for content_hash, overall_score, matched_skills in rows
+    }
+
+# Helper function to persist a ranked batch of resumes and their analyses
+def save_ranked_resumes(ranked_resumes, resume_data, job_desc_db_obj):
+    """
+    Adds Resume and ResumeAnalysis rows for a ranked batch to the session.
+
+    New resumes and their analyses are each written with one executemany insert of
+    plain column mappings instead of a unit-of-work pass per object. A resume whose text
+    matches one this user already stored (or an earlier one in the batch) reuses
+    that Resume row, and only new resumes need their uploaded file written to disk.
+    Returns (saved, new_uploads): saved holds (ranked_resume, original_data, resume_id,
+    analysis_row) tuples in rank order, where analysis_row is the inserted column
+    mapping including its 'id', and new_uploads holds the (data, path) pairs to pass
+    to persist_upload() once the caller's commit succeeds.
+    """
+    ordered_data = [resume_data[ranked_resume['resume_id']] for ranked_resume in ranked_resumes]
+
+    # Look up the ids of resumes already stored for this user with a single column-only query
+    resume_ids = dict(
+        db.session.query(Resume.content_hash, Resume.id).filter(
+            Resume.content_hash.in_({data['content_hash'] for data in ordered_data}),
+            Resume.uploaded_by == current_user.id
+        )
+    )
+
+    # The bulk insert skips the content validator, so content_hash and content_preview are set here
+    new_resume_rows = {}
+    new_uploads = []
+    for original_data in ordered_data:
+        content_hash = original_data['content_hash']
+        if content_hash in resume_ids or content_hash in new_resume_rows:
+            continue
+        new_uploads.append((original_data['file_data'], original_data['file_path']))
+        new_resume_rows[content_hash] = {
+            'filename': original_data['unique_filename'],
+            'original_filename': original_data['filename'],
+            'file_path': original_data['file_path'],
+            'content': original_data['content'],
+            'content_hash': content_hash,
+            'content_preview': get_content_preview(original_data['content']),
+            'skills': dump_json(original_data['skills']),
+            'experience_years': original_data['experience'],
+            'education': dump_json(original_data['education']),
+            'contact_info': dump_json(original_data['contact_info']),
+            'file_size': original_data['file_size'],
+            'file_type': original_data['file_type'],
+            'uploaded_by': current_user.id
+        }
+
+    # Insert without return_defaults (which sends one INSERT per row) and read the
+    # new ids back with one query; none of these hashes were stored for this user before
+    if new_resume_rows:
+        db.session.bulk_insert_mappings(Resume, list(new_resume_rows.values()))
+        resume_ids.update(
+            db.session.query(Resume.content_hash, Resume.id).filter(
+                Resume.content_hash.in_(new_resume_rows),
+                Resume.uploaded_by == current_user.id
+            )
+        )
+    resume_id_list = [resume_ids[data['content_hash']] for data in ordered_data]
+    db.session.flush() # Assigns an ID to a new job description
+
+    # Insert the analyses as plain mappings, skipping per-object unit-of-work bookkeeping
+    analysis_rows = []
+    for ranked_resume, resume_id in zip(ranked_resumes, resume_id_list):
+        analysis = ranked_resume['analysis']
+        analysis_rows.append({
+            'resume_id': resume_id,
+            'job_description_id': job_desc_db_obj.id,
+            'user_id': current_user.id,
+            'overall_score': analysis['overall_score'],
+            'skills_score': analysis['skills_score'],
+            'experience_score': analysis['experience_score'],
+            'education_score': analysis['education_score'],
+            'matched_skills': analysis['matched_skills'],
+            'missing_skills': analysis['missing_skills'],
+            'improvements': "\n".join(analysis['improvements']),
+            'skill_gap_suggestions': "\n".join(analysis['skill_gap_suggestions'])
+        })
+    ResumeAnalysis.bulk_create(analysis_rows)
+
+    return list(zip(ranked_resumes, ordered_data, resume_id_list, analysis_rows)), new_uploads
+
+# File-like object for streaming CSV: csv.writer.writerow returns the formatted line
+class EchoWriter:
+    """Returns whatever is written to it instead of storing it."""
+    def write(self, value):
+        return value
+
+# Helper function to format content for reports
+def format_list_for_report(items):
+    """Formats a list from one of the model getters as comma-separated text for reports."""
+    return ', '.join(items) if items else ''
+
+# Helper function to render an analysis's PDF report
+def build_pdf_report(analysis):
+    """Renders the PDF report for an analysis (with resume and JD loaded) and returns its bytes."""
+    styles = getSampleStyleSheet()
+    heading_style = styles['Heading3']
+    body_style = ParagraphStyle('ReportBody', parent=styles['Normal'], leftIndent=10)
+    resume = analysis.resume
+    job_description = analysis.job_description
+
+    # Build the report as flowables; reportlab handles wrapping and page breaks
+    story = [Paragraph(escape(f"Resume Analysis Report for {resume.original_filename}"), styles['Heading1'])]
+
+    def add_section(title, lines):
+        story.append(Paragraph(escape(title), heading_style))
+        story.extend(Paragraph(escape(line), body_style) for line in lines)
+        story.append(Spacer(1, 6))
+
+    resume_skills = [skill['skill'] if isinstance(skill, dict) else skill for skill in resume.get_skills_list()]
+    job_skills = [skill['skill'] if isinstance(skill, dict) else skill for skill in job_description.get_skills_list()]
+    education = [
+        f"{edu.get('degree', 'Unknown')} - {edu.get('field', 'Unknown')}" if isinstance(edu, dict) else edu
+        for edu in resume.get_education_list()
+    ]
+
+    add_section("Analysis Details:", [
+        f"Overall Score: {analysis.overall_score:.2f} (Rank: {analysis.rank_level})",
+        f"Skills Score: {analysis.skills_score:.2f}",
+        f"Experience Score: {analysis.experience_score:.2f}",
+        f"Education Score: {analysis.education_score:.2f}"
+    ])
+    add_section("Job Description:", [
+        f"Title: {job_description.title}",
+        f"Content: {job_description.content[:200]}...", # Truncate for report
+        f"Required Skills: {format_list_for_report(job_skills)}"
+    ])
+    add_section("Resume Details:", [
+        f"Filename: {resume.original_filename}",
+        f"Uploaded On: {resume.uploaded_at.isoformat(sep=' ', timespec='minutes')}",
+        f"Experience: {resume.experience_years} years",
+        f"Skills: {format_list_for_report(resume_skills)}",
+        f"Education: {format_list_for_report(education)}"
+    ])
+    add_section("Matched Skills:", [format_list_for_report(analysis.get_matched_skills())])
+    add_section("Missing Skills:", [format_list_for_report(analysis.get_missing_skills())])
+    # Split the stored suggestion text once; Paragraph wraps each line to the page width
+    add_section("Improvement Suggestions:", [line for line in (analysis.improvements or '').splitlines() if line.strip()])
+    add_section("Skill Gap Suggestions:", [line for line in (analysis.skill_gap_suggestions or '').splitlines() if line.strip()])
+
+    buffer = io.BytesIO()
+    SimpleDocTemplate(buffer, pagesize=letter, title=f"Analysis Report {analysis.id}").build(story)
+    return buffer.getvalue()
+
+# Background pool for building PDF reports off the request thread; finished
+# reports are kept in REPORTS_FOLDER and served from there
+report_pool = ThreadPoolExecutor(max_workers=app.config['REPORT_WORKERS'])
+_report_builds = {}
+_report_builds_lock = threading.Lock()
+
+def report_path(analysis_id, report_type):
+    """Returns where the stored report for an analysis lives."""
+    return os.path.join(app.config['REPORTS_FOLDER'], f"analysis_report_{analysis_id}.{report_type}")
+
+def _build_pdf_report_file(analysis_id):
+    """Builds and stores an analysis's PDF report (runs on the report pool)."""
+    try:
+        with app.app_context():
+            analysis = ResumeAnalysis.query.options(
+                joinedload(ResumeAnalysis.resume),
+                joinedload(ResumeAnalysis.job_description).undefer(JobDescription.content),
+                undefer_group('suggestions')
+            ).get(analysis_id)
+            if analysis is None:
+                raise LookupError(f"Analysis {analysis_id} no longer exists")
+            data = build_pdf_report(analysis)
+
+        path = report_path(analysis_id, 'pdf')
+        tmp_path = f"{path}.{secrets.token_hex(4)}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return path
+    finally:
+        with _report_builds_lock:
+            _report_builds.pop(analysis_id, None)
+
+def queue_pdf_report(analysis_id):
+    """
+    Starts building an analysis's PDF report in the background.
+
+    Returns the in-flight build's future, or None if the report is already stored.
+    """
+    with _report_builds_lock:
+        future = _report_builds.get(analysis_id)
+        if future is None:
+            if os.path.exists(report_path(analysis_id, 'pdf')):
+                return None
+            future = report_pool.submit(_build_pdf_report_file, analysis_id)
+            _report_builds[analysis_id] = future
+    return future
+
+# Helper function behind /api/check: analyze an already-stored resume and save the results
+def run_resume_check(resume_path, original_filename, job_description_content, jd_title, user_id, progress=None):
+    """
+    Analyzes a stored resume against a job description and saves the JD, resume and analysis.
+
+    Runs in the request or on a Celery worker, so it takes plain values rather than
+    the request and current_user. `progress`, if given, is called with the name of each
+    stage ('extracting', 'analyzing', 'saving') as it starts. Returns a JSON-serializable
+    summary of the analysis.
+    """
+    if progress:
+        progress('extracting')
+    with open(resume_path, 'rb') as f:
+        resume_bytes = f.read()
+    file_type = original_filename.rsplit('.', 1)[1]
+    resume_text = extract_resume_text(resume_bytes, file_type)
+    if not resume_text:
+        raise ValueError('Could not extract text from the resume file.')
+
+    if progress:
+        progress('analyzing')
+    resume_skills = resume_processor.extract_skills(resume_text)
+    resume_experience_years = resume_processor.extract_experience(resume_text)
+    resume_education = resume_processor.extract_education(resume_text)
+    job_skills = get_job_skills(job_description_content)
+    analysis_results = resume_processor.calculate_similarity_scores(
+        resume_text,
+        job_description_content,
+        resume_skills,
+        resume_experience_years,
+        resume_education,
+        job_skills=job_skills
+    )
+    improvement_suggestions = resume_processor.generate_improvement_suggestions(analysis_results)
+    skill_gap_suggestions = resume_processor.generate_skill_gap_suggestions(
+        analysis_results['missing_skills'], analysis_results['matched_skills']
+    )
+
+    if progress:
+        progress('saving')
+    try:
+        job_desc_db_obj = JobDescription.get_or_create(
+            job_description_content, user_id, jd_title or "Unnamed Job Description", job_skills
+        )
+        resume_db_obj = Resume(
+            filename=os.path.basename(resume_path),
+            original_filename=original_filename,
+            file_path=resume_path,
+            content=resume_text,
+            file_size=len(resume_bytes),
+            file_type=file_type.upper(),
+            experience_years=resume_experience_years
+        )
+        resume_db_obj.uploaded_by = user_id
+        resume_db_obj.set_skills_list(resume_skills)
+        resume_db_obj.set_education_list(resume_education)
+        resume_db_obj.set_contact_info(resume_processor.extract_contact_info(resume_text))
+        analysis_db_obj = ResumeAnalysis(
+            resume=resume_db_obj,
+            job_description=job_desc_db_obj,
+            user_id=user_id,
+            overall_score=analysis_results['overall_score'],
+            skills_score=analysis_results['skills_score'],
+            experience_score=analysis_results['experience_score'],
+            education_score=analysis_results['education_score'],
+            improvements="\n".join(improvement_suggestions),
+            skill_gap_suggestions="\n".join(skill_gap_suggestions)
+        )
+        analysis_db_obj.set_matched_skills(analysis_results['matched_skills'])
+        analysis_db_obj.set_missing_skills(analysis_results['missing_skills'])
+        db.session.add_all([resume_db_obj, analysis_db_obj])
+        db.session.flush()
+
+        analysis_dict = analysis_db_obj.to_dict()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return {
+        'user_id': user_id,
+        'resume_filename': original_filename,
+        'job_skills': analysis_results['job_skills'],
+        'analysis': analysis_dict
+    }
+
+if celery is not None:
+    @celery.task(bind=True, name='rankrite.analyze_resume')
+    def analyze_resume_task(self, resume_path, original_filename, job_description_content, jd_title, user_id):
+        """Celery task wrapper for run_resume_check() that reports each stage as PROGRESS."""
+        def report_stage(stage):
+            self.update_state(state='PROGRESS', meta={'stage': stage})
+
+        with app.app_context():
+            return run_resume_check(
+                resume_path, original_filename, job_description_content, jd_title, user_id,
+                progress=report_stage
+            )
+
+# Helper function to send a stored upload or report without streaming it through Python
+def send_stored_file(directory, filename, accel_prefix=None, mimetype=None, as_attachment=False):
+    """
+    Sends a file from one of the app's storage folders.
+
+    With an nginx internal location configured (accel_prefix) only an X-Accel-Redirect
+    header is returned and nginx sends the file itself; otherwise send_from_directory
+    is used, which honours USE_X_SENDFILE and the server's wsgi.file_wrapper.
+    Raises FileNotFoundError if the file is missing.
+    """
+    if not accel_prefix:
+        try:
+            return send_from_directory(directory, filename, mimetype=mimetype, as_attachment=as_attachment)
+        except NotFound:
+            raise FileNotFoundError(filename)
+
+    file_path = safe_join(directory, filename)
+    if file_path is None or not os.path.isfile(file_path):
+        raise FileNotFoundError(filename)
+    response = Response(mimetype=mimetype or mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+    response.headers['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + quote(filename)
+    if as_attachment:
+        response.headers.set('Content-Disposition', 'attachment', filename=filename)
+    return response
+
 # --- Routes ---
 
 @app.route('/')
@@ -89,11 +661,11 @@ def register():
             flash('Passwords do not match.', 'danger')
             return render_template('register.html')
 
-        if User.query.filter_by(username=username).first():
+        if db.session.query(User.query.filter_by(username=username).exists()).scalar():
             flash('Username already exists. Please choose a different one.', 'danger')
             return render_template('register.html')
 
-        if User.query.filter_by(email=email).first():
+        if db.session.query(User.query.filter_by(email=email).exists()).scalar():
             flash('Email already registered. Please use a different email or login.', 'danger')
             return render_template('register.html')
 
@@ -163,22 +735,30 @@ def check_resume():
     show_results = False
 
     if request.method == 'POST':
+        # Reject oversized bodies before Werkzeug parses and spools the upload
+        if request_too_large():
+            flash_request_too_large()
+            return redirect(url_for('check_resume'))
+
         jd_title = request.form.get('jd_title')
         job_description_content = request.form.get('job_description')
 
         if not job_description_content:
             flash('Job Description is required.', 'danger')
-            return render_template('check.html', show_results=False)
+            return redirect(url_for('check_resume'))
+
+        if job_description_too_long(job_description_content):
+            return redirect(url_for('check_resume'))
 
         # Handle resume file upload
         if 'resume_file' not in request.files:
             flash('No resume file part', 'danger')
-            return render_template('check.html', show_results=False)
+            return redirect(url_for('check_resume'))
 
         resume_file = request.files['resume_file']
         if resume_file.filename == '':
             flash('No selected resume file', 'danger')
-            return render_template('check.html', show_results=False)
+            return redirect(url_for('check_resume'))
 
         if resume_file and allowed_file(resume_file.filename):
             original_filename = secure_filename(resume_file.filename)
@@ -187,20 +767,19 @@ def check_resume():
             resume_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
 
             try:
-                resume_file.save(resume_path)
-                logger.info(f"Resume saved to: {resume_path}")
-
-                # Extract text from resume
-                resume_text = resume_processor.extract_text_from_file(resume_path)
+                # Read the upload once and extract text from memory
+                resume_bytes = resume_file.read()
+                resume_text = extract_resume_text(resume_bytes, original_filename.rsplit('.', 1)[1])
                 if not resume_text:
                     flash('Could not extract text from the resume file. Please ensure it is a readable PDF or DOCX.', 'danger')
-                    return render_template('check.html', show_results=False)
+                    return redirect(url_for('check_resume'))
 
                 # Extract features from resume
                 resume_skills = resume_processor.extract_skills(resume_text)
                 resume_experience_years = resume_processor.extract_experience(resume_text)
                 resume_education = resume_processor.extract_education(resume_text)
                 resume_contact_info = resume_processor.extract_contact_info(resume_text)
+                job_skills = get_job_skills(job_description_content)
 
                 # Calculate similarity scores and other analysis
                 analysis_results = resume_processor.calculate_similarity_scores(
@@ -208,7 +787,8 @@ def check_resume():
                     job_description_content,
                     resume_skills,
                     resume_experience_years,
-                    resume_education
+                    resume_education,
+                    job_skills=job_skills
                 )
 
                 # Generate suggestions
@@ -217,134 +797,130 @@ def check_resume():
                     analysis_results['missing_skills'], analysis_results['matched_skills']
                 )
 
-                # Store data in database if user is authenticated
-                resume_db_obj = None
-                job_desc_db_obj = None
-                analysis_db_obj = None
-
-                try:
-                    # Save Job Description
-                    # Check if a JD with the same content (and title if provided) already exists for this user
-                    existing_jd = JobDescription.query.filter(
-                        JobDescription.content == job_description_content,
-                        JobDescription.created_by == (current_user.id if current_user.is_authenticated else None)
-                    ).first()
-
-                    if existing_jd:
-                        job_desc_db_obj = existing_jd
-                    else:
-                        job_desc_db_obj = JobDescription(
-                            title=jd_title if jd_title else "Unnamed Job Description",
-                            content=job_description_content,
-                            created_by=current_user.id if current_user.is_authenticated else None
+                # Only signed-in users get the analysis saved to their history;
+                # anonymous results are shown without touching the database
+                if current_user.is_authenticated:
+                    try:
+                        # Save Job Description, reusing this user's existing JD with the same content
+                        job_desc_db_obj = JobDescription.get_or_create(
+                            job_description_content,
+                            current_user.id,
+                            jd_title if jd_title else "Unnamed Job Description",
+                            job_skills
                         )
-                        job_desc_db_obj.set_skills_list(resume_processor.extract_skills(job_description_content))
-                        db.session.add(job_desc_db_obj)
-                        db.session.flush() # Assigns ID without committing yet
-
-                    # Save Resume
-                    resume_db_obj = Resume(
-                        filename=unique_filename,
-                        original_filename=original_filename,
-                        file_path=resume_path, # Path to the permanently stored file
-                        content=resume_text,
-                        file_size=resume_file.content_length,
-                        file_type=original_filename.rsplit('.', 1)[1].upper(),
-                        experience_years=resume_experience_years
-                    )
-                    # Corrected: Assign user_id as an attribute after object creation
-                    resume_db_obj.uploaded_by = current_user.id if current_user.is_authenticated else None # Use uploaded_by from Resume model
-                    resume_db_obj.set_skills_list(resume_skills)
-                    resume_db_obj.set_education_list(resume_education)
-                    resume_db_obj.set_contact_info(resume_contact_info)
-                    db.session.add(resume_db_obj)
-                    db.session.flush() # Assigns ID without committing yet
-
-                    # Save Analysis
-                    analysis_db_obj = ResumeAnalysis(
-                        resume_id=resume_db_obj.id,
-                        job_description_id=job_desc_db_obj.id,
-                        user_id=current_user.id if current_user.is_authenticated else None,
-                        overall_score=analysis_results['overall_score'],
-                        skills_score=analysis_results['skills_score'],
-                        experience_score=analysis_results['experience_score'],
-                        education_score=analysis_results['education_score'],
-                        improvements="\n".join(improvement_suggestions),
-                        skill_gap_suggestions="\n".join(skill_gap_suggestions)
-                    )
-                    analysis_db_obj.set_matched_skills(analysis_results['matched_skills'])
-                    analysis_db_obj.set_missing_skills(analysis_results['missing_skills'])
-                    db.session.add(analysis_db_obj)
-                    db.session.commit()
-                    flash('Resume analyzed and saved to history!', 'success')
-
-                    # Pass all data to template for display
-                    show_results = True
-                    return render_template(
-                        'check.html',
-                        show_results=show_results,
-                        resume_filename=original_filename,
-                        job_description_content=job_description_content,
-                        analysis=analysis_db_obj.to_dict(), # Use to_dict for easy template access
-                        resume_details={
-                            'skills': resume_skills,
-                            'experience_years': resume_experience_years,
-                            'education': resume_education,
-                            'contact_info': resume_contact_info,
-                            'content': resume_text # Full content for detailed view
-                        },
-                        job_skills=analysis_results['job_skills'],
-                        jd_title=job_desc_db_obj.title,
-                        analysis_id=analysis_db_obj.id
-                    )
-
-                except Exception as e:
-                    db.session.rollback()
-                    logger.error(f"Database error during resume analysis storage: {e}")
-                    flash(f'An error occurred while saving analysis: {e}', 'danger')
-                    # Still show results if analysis was successful but saving failed
-                    show_results = True
-                    return render_template(
-                        'check.html',
-                        show_results=show_results,
-                        resume_filename=original_filename,
-                        job_description_content=job_description_content,
-                        analysis={
-                            'overall_score': analysis_results['overall_score'],
-                            'skills_score': analysis_results['skills_score'],
-                            'experience_score': analysis_results['experience_score'],
-                            'education_score': analysis_results['education_score'],
-                            'matched_skills': analysis_results['matched_skills'],
-                            'missing_skills': analysis_results['missing_skills'],
-                            'improvements': "\n".join(improvement_suggestions),
-                            'skill_gap_suggestions': "\n".join(skill_gap_suggestions),
-                            'rank_level': ResumeAnalysis(overall_score=analysis_results['overall_score']).rank_level,
-                            'rank_color': ResumeAnalysis(overall_score=analysis_results['overall_score']).rank_color
-                        },
-                        resume_details={
-                            'skills': resume_skills,
-                            'experience_years': resume_experience_years,
-                            'education': resume_education,
-                            'contact_info': resume_contact_info,
-                            'content': resume_text
-                        },
-                        job_skills=analysis_results['job_skills'],
-                        jd_title=jd_title if jd_title else "Unnamed Job Description"
-                    )
-                finally:
-                    # Removed os.remove(resume_path) here as per Scenario 1: Keep the file
-                    logger.info(f"Resume file retained at: {resume_path}")
+
+                        # Save Resume
+                        resume_db_obj = Resume(
+                            filename=unique_filename,
+                            original_filename=original_filename,
+                            file_path=resume_path, # Path to the permanently stored file
+                            content=resume_text,
+                            file_size=len(resume_bytes),
+                            file_type=original_filename.rsplit('.', 1)[1].upper(),
+                            experience_years=resume_experience_years
+                        )
+                        # Corrected: Assign user_id as an attribute after object creation
+                        resume_db_obj.uploaded_by = current_user.id # Use uploaded_by from Resume model
+                        resume_db_obj.set_skills_list(resume_skills)
+                        resume_db_obj.set_education_list(resume_education)
+                        resume_db_obj.set_contact_info(resume_contact_info)
+                        db.session.add(resume_db_obj)
+
+                        # Save Analysis (linked through relationships so everything goes out in one flush)
+                        analysis_db_obj = ResumeAnalysis(
+                            resume=resume_db_obj,
+                            job_description=job_desc_db_obj,
+                            user_id=current_user.id,
+                            overall_score=analysis_results['overall_score'],
+                            skills_score=analysis_results['skills_score'],
+                            experience_score=analysis_results['experience_score'],
+                            education_score=analysis_results['education_score'],
+                            improvements="\n".join(improvement_suggestions),
+                            skill_gap_suggestions="\n".join(skill_gap_suggestions)
+                        )
+                        analysis_db_obj.set_matched_skills(analysis_results['matched_skills'])
+                        analysis_db_obj.set_missing_skills(analysis_results['missing_skills'])
+                        db.session.add(analysis_db_obj)
+                        db.session.flush() # Writes the JD, resume and analysis and assigns their IDs
+
+                        # expire_on_commit is off, so these reads don't reload anything after the commit
+                        analysis_dict = analysis_db_obj.to_dict()
+                        saved_jd_title = job_desc_db_obj.title
+                        db.session.commit()
+
+                        # Keep the file only once its Resume row is saved; the write
+                        # happens off the request thread
+                        persist_upload(resume_bytes, resume_path)
+                        logger.info(f"Resume queued for saving to: {resume_path}")
+                        flash('Resume analyzed and saved to history!', 'success')
+
+                        # Pass all data to template for display
+                        show_results = True
+                        return render_template(
+                            'check.html',
+                            show_results=show_results,
+                            resume_filename=original_filename,
+                            job_description_content=job_description_content,
+                            analysis=analysis_dict, # Use to_dict for easy template access
+                            resume_details={
+                                'skills': resume_skills,
+                                'experience_years': resume_experience_years,
+                                'education': resume_education,
+                                'contact_info': resume_contact_info,
+                                'content': resume_text # Full content for detailed view
+                            },
+                            job_skills=analysis_results['job_skills'],
+                            jd_title=saved_jd_title,
+                            analysis_id=analysis_dict['id']
+                        )
+
+                    except Exception as e:
+                        db.session.rollback()
+                        logger.error(f"Database error during resume analysis storage: {e}")
+                        flash(f'An error occurred while saving analysis: {e}', 'danger')
+
+                # Show results that were not saved (anonymous user, or saving failed)
+                show_results = True
+                rank_fields = get_rank_fields(analysis_results['overall_score'])
+                return render_template(
+                    'check.html',
+                    show_results=show_results,
+                    resume_filename=original_filename,
+                    job_description_content=job_description_content,
+                    analysis={
+                        # Same 0-100 scale as ResumeAnalysis.to_dict() on the saved path
+                        'overall_score': rank_fields['overall_score_pct'],
+                        'skills_score': round(analysis_results['skills_score'] * 100, 2),
+                        'experience_score': round(analysis_results['experience_score'] * 100, 2),
+                        'education_score': round(analysis_results['education_score'] * 100, 2),
+                        'matched_skills': analysis_results['matched_skills'],
+                        'missing_skills': analysis_results['missing_skills'],
+                        'improvements': "\n".join(improvement_suggestions),
+                        'skill_gap_suggestions': "\n".join(skill_gap_suggestions),
+                        'rank_level': rank_fields['rank_level'],
+                        'rank_color': rank_fields['rank_color']
+                    },
+                    resume_details={
+                        'skills': resume_skills,
+                        'experience_years': resume_experience_years,
+                        'education': resume_education,
+                        'contact_info': resume_contact_info,
+                        'content': resume_text
+                    },
+                    job_skills=analysis_results['job_skills'],
+                    jd_title=jd_title if jd_title else "Unnamed Job Description"
+                )
 
             except (RuntimeError, NotImplementedError, ValueError) as e:
                 flash(f"File processing error: {e}", 'danger')
-                return render_template('check.html', show_results=False)
+                return redirect(url_for('check_resume'))
             except Exception as e:
                 flash(f"An unexpected error occurred during processing: {e}", 'danger')
                 logger.error(f"Unexpected error in check_resume: {e}")
-                return render_template('check.html', show_results=False)
+                return redirect(url_for('check_resume'))
         else:
             flash('Invalid resume file type. Allowed types are: PDF, DOCX, DOC.', 'danger')
-            return render_template('check.html', show_results=False)
+            return redirect(url_for('check_resume'))
 
     return render_template('check.html', show_results=show_results)
 
@@ -353,6 +929,11 @@ def check_resume():
 def compare_resumes():
     """Handles comparison of two resumes against a single job description."""
     if request.method == 'POST':
+        # Reject oversized bodies before Werkzeug parses and spools the uploads
+        if request_too_large():
+            flash_request_too_large()
+            return redirect(url_for('compare_resumes'))
+
         # Get form data
         jd_title = request.form.get('jd_title', 'Unnamed Job Description')
         job_description_content = request.form.get('job_description')
@@ -362,6 +943,9 @@ def compare_resumes():
             flash('Job Description is required for comparison.', 'danger')
             return redirect(url_for('compare_resumes'))
 
+        if job_description_too_long(job_description_content):
+            return redirect(url_for('compare_resumes'))
+
         # Get uploaded files
         resumeA = request.files.get('resumeA')
         resumeB = request.files.get('resumeB')
@@ -379,137 +963,75 @@ def compare_resumes():
 
         # Process files
         try:
-            # Process Resume A
-            original_filenameA = secure_filename(resumeA.filename)
-            unique_filenameA = f"{secrets.token_hex(8)}_{original_filenameA}"
-            resume_pathA = os.path.join(app.config['UPLOAD_FOLDER'], unique_filenameA)
-            resumeA.save(resume_pathA)
-            resume_textA = resume_processor.extract_text_from_file(resume_pathA)
-            
-            # Process Resume B
-            original_filenameB = secure_filename(resumeB.filename)
-            unique_filenameB = f"{secrets.token_hex(8)}_{original_filenameB}"
-            resume_pathB = os.path.join(app.config['UPLOAD_FOLDER'], unique_filenameB)
-            resumeB.save(resume_pathB)
-            resume_textB = resume_processor.extract_text_from_file(resume_pathB)
+            # Read and parse both resumes side by side, as /multiple does
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                outcomes = list(executor.map(process_uploaded_resume, [resumeA, resumeB], generate_upload_tokens(2)))
+
+            for resume_data, error in outcomes:
+                if error:
+                    flash(*error)
+                    return redirect(url_for('compare_resumes'))
+
+            resume_dataA, resume_dataB = (resume_data for resume_data, _ in outcomes)
+            for resume_id, (resume_data, candidate_name) in enumerate(zip((resume_dataA, resume_dataB), (candidateA_name, candidateB_name))):
+                resume_data['id'] = resume_id
+                resume_data['candidate_name'] = candidate_name
+                resume_data['word_count'] = len(resume_data['content'].split())
             
-            # Extract features
-            resume_dataA = {
-                'id': 0,
-                'filename': original_filenameA,
-                'unique_filename': unique_filenameA,
-                'file_path': resume_pathA,
-                'content': resume_textA,
-                'file_size': resumeA.content_length,
-                'file_type': original_filenameA.rsplit('.', 1)[1].upper(),
-                'skills': resume_processor.extract_skills(resume_textA),
-                'experience': resume_processor.extract_experience(resume_textA),
-                'education': resume_processor.extract_education(resume_textA),
-                'contact_info': resume_processor.extract_contact_info(resume_textA),
-                'candidate_name': candidateA_name,
-                'word_count': len(resume_textA.split()) if resume_textA else 0
-            }
-            
-            resume_dataB = {
-                'id': 1,
-                'filename': original_filenameB,
-                'unique_filename': unique_filenameB,
-                'file_path': resume_pathB,
-                'content': resume_textB,
-                'file_size': resumeB.content_length,
-                'file_type': original_filenameB.rsplit('.', 1)[1].upper(),
-                'skills': resume_processor.extract_skills(resume_textB),
-                'experience': resume_processor.extract_experience(resume_textB),
-                'education': resume_processor.extract_education(resume_textB),
-                'contact_info': resume_processor.extract_contact_info(resume_textB),
-                'candidate_name': candidateB_name,
-                'word_count': len(resume_textB.split()) if resume_textB else 0
-            }
-            
-            # Perform ranking
-            ranked_resumes = resume_processor.rank_multiple_resumes(
-                [resume_dataA, resume_dataB], 
-                job_description_content
-            )
-            
-            # Store Job Description
-            job_desc_db_obj = JobDescription.query.filter(
-                JobDescription.content == job_description_content,
-                JobDescription.created_by == current_user.id
-            ).first()
-            
-            if not job_desc_db_obj:
-                job_desc_db_obj = JobDescription(
-                    title=jd_title,
-                    content=job_description_content,
-                    created_by=current_user.id
-                )
-                job_desc_db_obj.set_skills_list(resume_processor.extract_skills(job_description_content))
-                db.session.add(job_desc_db_obj)
-                db.session.flush()
-            
-            # Process results
+            # Reuse the stored analysis of any resume already compared against this JD
             results = {'candidateA': None, 'candidateB': None}
-            
-            for ranked_resume in ranked_resumes:
-                # Get original data
-                original_data = resume_dataA if ranked_resume['resume_id'] == 0 else resume_dataB
-                
-                # Save Resume to DB
-                existing_resume = Resume.query.filter(
-                    Resume.filename == original_data['unique_filename'],
-                    Resume.uploaded_by == current_user.id
-                ).first()
-                
-                if existing_resume:
-                    resume_db_obj = existing_resume
-                else:
-                    resume_db_obj = Resume(
-                        filename=original_data['unique_filename'],
-                        original_filename=original_data['filename'],
-                        file_path=original_data['file_path'],
-                        content=original_data['content'],
-                        file_size=original_data['file_size'],
-                        file_type=original_data['file_type'],
-                        experience_years=original_data['experience']
-                    )
-                    resume_db_obj.uploaded_by = current_user.id
-                    resume_db_obj.set_skills_list(original_data['skills'])
-                    resume_db_obj.set_education_list(original_data['education'])
-                    resume_db_obj.set_contact_info(original_data['contact_info'])
-                    db.session.add(resume_db_obj)
-                    db.session.flush()
-                
-                # Save Analysis
-                analysis_db_obj = ResumeAnalysis(
-                    resume_id=resume_db_obj.id,
-                    job_description_id=job_desc_db_obj.id,
-                    user_id=current_user.id,
-                    overall_score=ranked_resume['analysis']['overall_score'],
-                    skills_score=ranked_resume['analysis']['skills_score'],
-                    experience_score=ranked_resume['analysis']['experience_score'],
-                    education_score=ranked_resume['analysis']['education_score'],
-                    improvements="\n".join(resume_processor.generate_improvement_suggestions(ranked_resume['analysis'])),
-                    skill_gap_suggestions="\n".join(resume_processor.generate_skill_gap_suggestions(
-                        ranked_resume['analysis']['missing_skills'], 
-                        ranked_resume['analysis']['matched_skills']
-                    ))
-                )
-                analysis_db_obj.set_matched_skills(ranked_resume['analysis']['matched_skills'])
-                analysis_db_obj.set_missing_skills(ranked_resume['analysis']['missing_skills'])
-                db.session.add(analysis_db_obj)
-                
-                # Prepare result for display
-                candidate_key = 'candidateA' if ranked_resume['resume_id'] == 0 else 'candidateB'
+            saved_job_desc = JobDescription.find_by_content(job_description_content, current_user.id)
+            saved_analyses = find_saved_analyses(
+                {resume_dataA['content_hash'], resume_dataB['content_hash']}, saved_job_desc
+            ) if saved_job_desc else {}
+
+            resumes_to_rank = []
+            for resume_data in (resume_dataA, resume_dataB):
+                saved_analysis = saved_analyses.get(resume_data['content_hash'])
+                if saved_analysis is None:
+                    resumes_to_rank.append(resume_data)
+                    continue
+                overall_score, matched_skills = saved_analysis
+                candidate_key = 'candidateA' if resume_data['id'] == 0 else 'candidateB'
                 results[candidate_key] = {
-                    'name': original_data['candidate_name'],
-                    'overall_score': round(ranked_resume['analysis']['overall_score'] * 100, 1),  # Convert to percentage
-                    'matched_skills': ranked_resume['analysis']['matched_skills'],
-                    'word_count': original_data['word_count']
+                    'name': resume_data['candidate_name'],
+                    'overall_score': round(overall_score * 100, 1),  # Convert to percentage
+                    'matched_skills': matched_skills,
+                    'word_count': resume_data['word_count']
                 }
-            
-            # Commit to database
-            db.session.commit()
+
+            if resumes_to_rank:
+                # Extract JD skills once for both ranking and the JobDescription row
+                job_skills = get_job_skills(job_description_content)
+
+                # Perform ranking
+                ranked_resumes = resume_processor.rank_multiple_resumes(
+                    resumes_to_rank,
+                    job_description_content,
+                    job_skills=job_skills
+                )
+
+                # Store Job Description (written along with the resumes and analyses)
+                job_desc_db_obj = saved_job_desc or JobDescription.get_or_create(
+                    job_description_content, current_user.id, jd_title, job_skills
+                )
+
+                # Save resumes and analyses, then prepare results for display
+                saved, new_uploads = save_ranked_resumes(ranked_resumes, [resume_dataA, resume_dataB], job_desc_db_obj)
+
+                for ranked_resume, original_data, resume_id, analysis_row in saved:
+                    candidate_key = 'candidateA' if ranked_resume['resume_id'] == 0 else 'candidateB'
+                    results[candidate_key] = {
+                        'name': original_data['candidate_name'],
+                        'overall_score': round(ranked_resume['analysis']['overall_score'] * 100, 1),  # Convert to percentage
+                        'matched_skills': ranked_resume['analysis']['matched_skills'],
+                        'word_count': original_data['word_count']
+                    }
+
+                # Commit to database, then write the new resumes' files
+                db.session.commit()
+                for data, path in new_uploads:
+                    persist_upload(data, path)
             
             # Prepare results for template
             template_results = {
@@ -538,6 +1060,11 @@ def compare_resumes():
 def multiple_resumes():
     """Handles analysis and ranking of multiple resumes."""
     if request.method == 'POST':
+        # Reject oversized bodies before Werkzeug parses and spools the uploads
+        if request_too_large():
+            flash_request_too_large()
+            return render_template('multiple_resume.html', show_results=False)
+
         # Get form data
         jd_title = request.form.get('job_title', 'Unnamed Job Description')
         job_description_content = request.form.get('job_description')
@@ -546,6 +1073,9 @@ def multiple_resumes():
         if not job_description_content:
             flash('Job Description is required.', 'danger')
             return render_template('multiple_resume.html', show_results=False)
+
+        if job_description_too_long(job_description_content):
+            return render_template('multiple_resume.html', show_results=False)
         
         # Get uploaded files (handle both naming conventions)
         resume_files = request.files.getlist('resume_files[]') or request.files.getlist('resume_files')
@@ -555,155 +1085,107 @@ def multiple_resumes():
             flash('No resumes selected for upload.', 'danger')
             return render_template('multiple_resume.html', show_results=False)
         
-        # Process files
-        processed_resumes = []
-        uploaded_paths = []
-        
+        # Validate file types
+        valid_files = []
         for resume_file in resume_files:
             if resume_file and allowed_file(resume_file.filename):
-                try:
-                    original_filename = secure_filename(resume_file.filename)
-                    unique_filename = f"{secrets.token_hex(8)}_{original_filename}"
-                    resume_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-                    resume_file.save(resume_path)
-                    uploaded_paths.append(resume_path)
-                    
-                    resume_text = resume_processor.extract_text_from_file(resume_path)
-                    if not resume_text:
-                        flash(f'Could not extract text from {original_filename}. Skipping.', 'warning')
-                        continue
-                    
-                    processed_resumes.append({
-                        'id': len(processed_resumes),
-                        'filename': original_filename,
-                        'unique_filename': unique_filename,
-                        'file_path': resume_path,
-                        'content': resume_text,
-                        'file_size': resume_file.content_length,
-                        'file_type': original_filename.rsplit('.', 1)[1].upper(),
-                        'skills': resume_processor.extract_skills(resume_text),
-                        'experience': resume_processor.extract_experience(resume_text),
-                        'education': resume_processor.extract_education(resume_text),
-                        'contact_info': resume_processor.extract_contact_info(resume_text)
-                    })
-                    
-                except Exception as e:
-                    flash(f"Error processing {resume_file.filename}: {str(e)}", 'danger')
+                valid_files.append(resume_file)
             else:
                 flash(f"Invalid file type for {resume_file.filename}. Allowed types are: PDF, DOCX, DOC. Skipping.", 'danger')
         
+        # Save and parse resumes in parallel; PDF parsing releases the GIL so threads overlap
+        processed_resumes = []
+        if valid_files:
+            max_workers = min(8, os.cpu_count() or 1, len(valid_files))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                tokens = generate_upload_tokens(len(valid_files))
+                outcomes = list(executor.map(process_uploaded_resume, valid_files, tokens))
+            
+            seen_hashes = set()
+            for resume_data, error in outcomes:
+                if error:
+                    flash(*error)
+                    continue
+                # Rank identical resumes once, whatever they were named
+                if resume_data['content_hash'] in seen_hashes:
+                    flash(f"{resume_data['filename']} has the same content as another uploaded resume. Skipping.", 'info')
+                    continue
+                seen_hashes.add(resume_data['content_hash'])
+                resume_data['id'] = len(processed_resumes)
+                processed_resumes.append(resume_data)
+        
         # Check if we have any valid resumes
         if not processed_resumes:
             flash('No valid resumes were processed. Please check file types.', 'danger')
             return render_template('multiple_resume.html', show_results=False)
         
         try:
+            # Extract JD skills once for both ranking and the JobDescription row
+            job_skills = get_job_skills(job_description_content)
+
             # Perform ranking
-            ranked_resumes = resume_processor.rank_multiple_resumes(processed_resumes, job_description_content)
-            
-            # Store Job Description
-            job_desc_db_obj = JobDescription.query.filter(
-                JobDescription.content == job_description_content,
-                JobDescription.created_by == current_user.id
-            ).first()
+            ranked_resumes = resume_processor.rank_multiple_resumes(
+                processed_resumes,
+                job_description_content,
+                job_skills=job_skills
+            )
             
-            if not job_desc_db_obj:
-                job_desc_db_obj = JobDescription(
-                    title=jd_title,
-                    content=job_description_content,
-                    created_by=current_user.id
-                )
-                job_desc_db_obj.set_skills_list(resume_processor.extract_skills(job_description_content))
-                db.session.add(job_desc_db_obj)
-                db.session.flush()
+            # Store Job Description (written along with the resumes and analyses)
+            job_desc_db_obj = JobDescription.get_or_create(
+                job_description_content, current_user.id, jd_title, job_skills
+            )
             
-            # Save results
+            # Save resumes and analyses
+            saved, new_uploads = save_ranked_resumes(ranked_resumes, processed_resumes, job_desc_db_obj)
             rankings = []  # Changed variable name to match template
+
+            # Scale every resume's scores to percentages in one array operation
+            score_keys = ('overall_score', 'skills_score', 'experience_score', 'education_score')
+            score_pcts = np.round(np.array(
+                [[ranked_resume['analysis'][key] for key in score_keys] for ranked_resume in ranked_resumes],
+                dtype=float
+            ).reshape(-1, len(score_keys)) * 100, 1).tolist()
             
-            for i, ranked_resume in enumerate(ranked_resumes):
-                original_data = processed_resumes[ranked_resume['resume_id']]
-                
-                # Save Resume to DB
-                existing_resume = Resume.query.filter(
-                    Resume.filename == original_data['unique_filename'],
-                    Resume.uploaded_by == current_user.id
-                ).first()
-                
-                if existing_resume:
-                    resume_db_obj = existing_resume
-                else:
-                    resume_db_obj = Resume(
-                        filename=original_data['unique_filename'],
-                        original_filename=original_data['filename'],
-                        file_path=original_data['file_path'],
-                        content=original_data['content'],
-                        file_size=original_data['file_size'],
-                        file_type=original_data['file_type'],
-                        experience_years=original_data['experience']
-                    )
-                    resume_db_obj.uploaded_by = current_user.id
-                    resume_db_obj.set_skills_list(original_data['skills'])
-                    resume_db_obj.set_education_list(original_data['education'])
-                    resume_db_obj.set_contact_info(original_data['contact_info'])
-                    db.session.add(resume_db_obj)
-                    db.session.flush()
-                
-                # Save Analysis
-                analysis_db_obj = ResumeAnalysis(
-                    resume_id=resume_db_obj.id,
-                    job_description_id=job_desc_db_obj.id,
-                    user_id=current_user.id,
-                    overall_score=ranked_resume['analysis']['overall_score'],
-                    skills_score=ranked_resume['analysis']['skills_score'],
-                    experience_score=ranked_resume['analysis']['experience_score'],
-                    education_score=ranked_resume['analysis']['education_score'],
-                    improvements="\n".join(resume_processor.generate_improvement_suggestions(ranked_resume['analysis'])),
-                    skill_gap_suggestions="\n".join(resume_processor.generate_skill_gap_suggestions(
-                        ranked_resume['analysis']['missing_skills'], 
-                        ranked_resume['analysis']['matched_skills']
-                    ))
-                )
-                analysis_db_obj.set_matched_skills(ranked_resume['analysis']['matched_skills'])
-                analysis_db_obj.set_missing_skills(ranked_resume['analysis']['missing_skills'])
-                db.session.add(analysis_db_obj)
-                
+            for i, ((ranked_resume, original_data, resume_id, analysis_row), pcts) in enumerate(zip(saved, score_pcts)):
+                analysis = ranked_resume['analysis']
+                overall_score = analysis['overall_score']
                 # Prepare result for display
                 rankings.append({
                     'rank_position': i + 1,  # Add rank position
-                    'resume_id': resume_db_obj.id,
-                    'analysis_id': analysis_db_obj.id,  # Add analysis ID for view details
+                    'resume_id': resume_id,
+                    'analysis_id': analysis_row['id'],  # Add analysis ID for view details
                     'filename': original_data['filename'],
-                    'overall_score': round(ranked_resume['analysis']['overall_score'] * 100, 1),
-                    'rank_level': ResumeAnalysis(overall_score=ranked_resume['analysis']['overall_score']).rank_level,
-                    'rank_color': ResumeAnalysis(overall_score=ranked_resume['analysis']['overall_score']).rank_color,
-                    'skills_score': round(ranked_resume['analysis']['skills_score'] * 100, 1),
-                    'experience_score': round(ranked_resume['analysis']['experience_score'] * 100, 1),
-                    'education_score': round(ranked_resume['analysis']['education_score'] * 100, 1),
-                    'matched_skills': ranked_resume['analysis']['matched_skills'],
-                    'missing_skills': ranked_resume['analysis']['missing_skills'],
-                    'improvements': resume_processor.generate_improvement_suggestions(ranked_resume['analysis']),
-                    'skill_gap_suggestions': resume_processor.generate_skill_gap_suggestions(
-                        ranked_resume['analysis']['missing_skills'], 
-                        ranked_resume['analysis']['matched_skills']
-                    ),
+                    'overall_score': pcts[0],
+                    'rank_level': analysis_row['rank_level'],
+                    'rank_color': analysis_row['rank_color'],
+                    'skills_score': pcts[1],
+                    'experience_score': pcts[2],
+                    'education_score': pcts[3],
+                    'matched_skills': analysis['matched_skills'],
+                    'missing_skills': analysis['missing_skills'],
+                    'improvements': analysis['improvements'],
+                    'skill_gap_suggestions': analysis['skill_gap_suggestions'],
                     'analysis': {  # Add analysis object for template
-                        'overall_score': ranked_resume['analysis']['overall_score'],
-                        'skills_score': ranked_resume['analysis']['skills_score'],
-                        'experience_score': ranked_resume['analysis']['experience_score'],
-                        'education_score': ranked_resume['analysis']['education_score']
+                        'overall_score': overall_score,
+                        'skills_score': analysis['skills_score'],
+                        'experience_score': analysis['experience_score'],
+                        'education_score': analysis['education_score']
                     }
                 })
             
             # Commit to database
+            saved_jd_title = job_desc_db_obj.title
             db.session.commit()
+            for data, path in new_uploads:
+                persist_upload(data, path)
             flash('Multiple resumes analyzed and ranked successfully!', 'success')
             
-            # Render results
-            return render_template(
+            # Stream results so large batches start rendering per ranking
+            return stream_template(
                 'multiple_resume.html',
                 show_results=True,
                 job_description_content=job_description_content,
-                job_title=job_desc_db_obj.title,  # Changed from jd_title to job_title
+                job_title=saved_jd_title,  # Changed from jd_title to job_title
                 rankings=rankings  # Changed variable name to match template
             )
             
@@ -715,28 +1197,251 @@ def multiple_resumes():
     
     return render_template('multiple_resume.html', show_results=False)
 
+@app.route('/api/check', methods=['POST'])
+@login_required
+def api_check_resume():
+    """
+    JSON counterpart of /check. With a Celery broker configured the analysis is queued
+    and a task id is returned for polling /status/<task_id>; otherwise it runs here.
+    """
+    if request_too_large():
+        return jsonify(error='Upload is too large.'), 413
+
+    jd_title = request.form.get('jd_title')
+    job_description_content = request.form.get('job_description')
+    if not job_description_content:
+        return jsonify(error='Job Description is required.'), 400
+    if len(job_description_content) > app.config['MAX_JOB_DESCRIPTION_LENGTH']:
+        return jsonify(error='Job Description is too long.'), 400
+
+    # Either a multipart file or the upload_id of a file already sent to /api/upload
+    upload_id = request.form.get('upload_id')
+    resume_file = request.files.get('resume_file')
+    if upload_id:
+        if upload_id not in session.get('pending_uploads', []):
+            return jsonify(error='Unknown upload_id.'), 400
+        session['pending_uploads'] = [name for name in session['pending_uploads'] if name != upload_id]
+        session.modified = True
+        resume_path = os.path.join(app.config['UPLOAD_FOLDER'], upload_id)
+        original_filename = upload_id.split('_', 1)[1]
+    elif resume_file and allowed_file(resume_file.filename):
+        original_filename = secure_filename(resume_file.filename)
+        resume_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{secrets.token_hex(8)}_{original_filename}")
+        # Write the upload now; a worker on another process reads it from the shared uploads folder
+        resume_file.save(resume_path, buffer_size=UPLOAD_COPY_BUFFER_SIZE)
+    else:
+        return jsonify(error='A PDF, DOCX or DOC resume file is required.'), 400
+
+    if celery is not None:
+        task = analyze_resume_task.delay(
+            resume_path, original_filename, job_description_content, jd_title, current_user.id
+        )
+        # Only this session may watch the task through /status and /events
+        remember_in_session('queued_tasks', task.id, SESSION_TASKS_KEPT)
+        return jsonify(
+            task_id=task.id,
+            status_url=url_for('task_status', task_id=task.id),
+            events_url=url_for('task_events', task_id=task.id)
+        ), 202
+
+    try:
+        result = run_resume_check(resume_path, original_filename, job_description_content, jd_title, current_user.id)
+    except Exception as e:
+        logger.error(f"Error in API resume check: {str(e)}", exc_info=True)
+        return jsonify(status='FAILURE', error=str(e)), 500
+    return jsonify(status='SUCCESS', result=result)
+
+@app.route('/api/upload/<filename>', methods=['PUT'])
+@login_required
+def api_upload_resume(filename):
+    """
+    Stores a resume sent as the raw request body, skipping multipart parsing.
+
+    The body is copied to the uploads folder in UPLOAD_COPY_BUFFER_SIZE chunks; pass the
+    returned upload_id to /api/check to analyze it.
+    """
+    original_filename = secure_filename(filename)
+    if not allowed_file(original_filename):
+        return jsonify(error='Allowed types are: PDF, DOCX, DOC.'), 400
+    if request.content_length is None:
+        return jsonify(error='Content-Length is required.'), 411
+    if request_too_large():
+        return jsonify(error='Upload is too large.'), 413
+
+    upload_id = f"{secrets.token_hex(8)}_{original_filename}"
+    resume_path = os.path.join(app.config['UPLOAD_FOLDER'], upload_id)
+    try:
+        with open(resume_path, 'wb') as f:
+            shutil.copyfileobj(request.stream, f, length=UPLOAD_COPY_BUFFER_SIZE)
+            written = f.tell()
+    except ClientDisconnected:
+        written = None
+    except OSError as e:
+        remove_upload(upload_id)
+        logger.error(f"Failed to store upload {upload_id}: {e}")
+        return jsonify(error='The upload could not be stored.'), 500
+    if written != request.content_length:
+        remove_upload(upload_id)
+        return jsonify(error='The request body is shorter than its Content-Length.'), 400
+
+    # Remember the upload in the session so only this user can analyze it; staged files
+    # that fall off the end of the list can no longer be used, so delete them
+    for stale_id in remember_in_session('pending_uploads', upload_id, PENDING_UPLOADS_KEPT):
+        remove_upload(stale_id)
+    return jsonify(upload_id=upload_id), 201
+
+# Helper function to delete a staged /api/upload file
+def remove_upload(upload_id):
+    """Deletes an upload from UPLOAD_FOLDER, ignoring one that is already gone."""
+    try:
+        os.remove(os.path.join(app.config['UPLOAD_FOLDER'], upload_id))
+    except FileNotFoundError:
+        pass
+
+# Helper function to check a task id against the ones this session queued
+def owns_task(task_id):
+    """True if task_id was queued by /api/check in the current session."""
+    return task_id in session.get('queued_tasks', [])
+
+# Helper function to describe a queued /api/check task for /status and /events
+def describe_task(task):
+    """
+    Returns a JSON-serializable summary of a Celery task's state.
+
+    Callers must check owns_task() first: errors and results are returned as-is.
+    """
+    # Read the state once; each access can go back to the result backend
+    state = task.state
+    if state == 'FAILURE':
+        return {'status': state, 'error': str(task.result)}
+    if state == 'PROGRESS':
+        return {'status': state, 'stage': (task.info or {}).get('stage')}
+    if state != 'SUCCESS':
+        return {'status': state}
+    return {'status': state, 'result': task.result}
+
+@app.route('/status/<task_id>')
+@login_required
+def task_status(task_id):
+    """Reports the state of a queued /api/check analysis, with its result once finished."""
+    if celery is None:
+        return jsonify(error='Background analysis is not enabled.'), 404
+    if not owns_task(task_id):
+        return jsonify(error='Task not found.'), 404
+
+    return jsonify(describe_task(celery.AsyncResult(task_id)))
+
+@app.route('/events/<task_id>')
+@login_required
+def task_events(task_id):
+    """
+    Streams a queued /api/check analysis' progress as Server-Sent Events.
+
+    An event is sent each time the task's state or stage changes, ending with its
+    result or error, so clients don't have to poll /status. The stream gives up after
+    TASK_EVENTS_TIMEOUT seconds, since Celery reports a lost or expired task as PENDING forever.
+    """
+    if celery is None:
+        return jsonify(error='Background analysis is not enabled.'), 404
+    if not owns_task(task_id):
+        return jsonify(error='Task not found.'), 404
+
+    deadline = time.monotonic() + app.config['TASK_EVENTS_TIMEOUT']
+
+    def generate():
+        task = celery.AsyncResult(task_id)
+        last_summary = None
+        while True:
+            summary = describe_task(task)
+            if summary != last_summary:
+                yield f"data: {dump_json(summary)}\n\n"
+                last_summary = summary
+            if summary['status'] in ('SUCCESS', 'FAILURE', 'REVOKED'):
+                return
+            if time.monotonic() >= deadline:
+                yield f"event: error\ndata: {dump_json({'error': 'Timed out waiting for the task.'})}\n\n"
+                return
+            time.sleep(TASK_EVENTS_POLL_SECONDS)
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Let nginx pass events through unbuffered
+    return response
+
+# Helper function to read the history keyset cursor from the query string
+def get_history_cursor():
+    """
+    Returns (before, before_id, limit) for one page of history.
+
+    before/before_id are the (created_at, id) of the previous page's last row;
+    limit defaults to, and is capped at, HISTORY_PER_PAGE.
+    """
+    per_page = app.config['HISTORY_PER_PAGE']
+    limit = min(max(request.args.get('limit', per_page, type=int), 1), per_page)
+    try:
+        before = datetime.fromisoformat(request.args['before']) if request.args.get('before') else None
+    except ValueError:
+        before = None  # Malformed cursor; start from the newest analysis
+    before_id = request.args.get('before_id', type=int)
+    return before, before_id, limit
+
 @app.route('/history')
 @login_required
 def history():
-    """Renders the user's analysis history."""
-    # Eager load Resume and JobDescription to avoid N+1 queries
-    analyses = ResumeAnalysis.query.options(
-        joinedload(ResumeAnalysis.resume),
-        joinedload(ResumeAnalysis.job_description)
-    ).filter_by(user_id=current_user.id).order_by(ResumeAnalysis.created_at.desc()).all()
-    return render_template('history.html', title='Analysis History', analyses=analyses)
+    """Renders the user's analysis history; the page loads its rows from /api/history one page at a time."""
+    # The summary cards cover every analysis, so count them in SQL rather than from the loaded pages
+    return render_template('history.html', title='Analysis History', stats=get_user_stats(current_user.id))
+
+@app.route('/api/history')
+@login_required
+def api_history():
+    """Returns one page of the user's analysis history as JSON for the history page's table."""
+    before, before_id, limit = get_history_cursor()
+    history_items = []
+    # One extra row tells us whether there is a next page
+    for analysis in ResumeAnalysis.list_dicts(current_user.id, before, before_id, limit + 1):
+        history_items.append({
+            'id': analysis['id'],
+            'type': 'single',
+            'filename': analysis['resume_filename'],
+            'job_title': analysis['job_title'],
+            'score': analysis['overall_score'],
+            'rank_level': analysis['rank_level'],
+            'created_at': analysis['created_at'],
+            'breakdown': {
+                'skills': analysis['skills_score'],
+                'experience': analysis['experience_score'],
+                'education': analysis['education_score']
+            },
+            'matched_skills': analysis['matched_skills'],
+            'missing_skills': analysis['missing_skills'],
+            'recommendations': [line for line in (analysis['improvements'] or '').splitlines() if line],
+            'skill_gap_suggestions': [line for line in (analysis['skill_gap_suggestions'] or '').splitlines() if line]
+        })
+
+    next_cursor = None
+    if len(history_items) > limit:
+        history_items = history_items[:limit]
+        next_cursor = {'before': history_items[-1]['created_at'], 'before_id': history_items[-1]['id']}
+
+    # Serialized with dump_json (orjson when installed)
+    return Response(
+        dump_json({'success': True, 'history': history_items, 'next_cursor': next_cursor}),
+        mimetype='application/json'
+    )
+
 @app.route('/analysis/<int:analysis_id>')
 @login_required
 def view_analysis(analysis_id):
     """Displays a detailed view of a specific analysis."""
     analysis = ResumeAnalysis.query.options(
-        joinedload(ResumeAnalysis.resume),
-        joinedload(ResumeAnalysis.job_description)
-    ).get_or_404(analysis_id)
+        joinedload(ResumeAnalysis.resume).undefer(Resume.content),
+        joinedload(ResumeAnalysis.job_description).undefer(JobDescription.content),
+        undefer_group('suggestions')
+    ).filter_by(id=analysis_id, user_id=current_user.id).first_or_404()
 
-    if analysis.user_id != current_user.id:
-        flash('You do not have permission to view this analysis.', 'danger')
-        return redirect(url_for('history'))
+    # Start building the PDF report now so the download link is served from disk
+    queue_pdf_report(analysis.id)
 
     # Re-process text content if needed, or rely on stored parsed data
     # For simplicity, we'll use the data stored in the database objects
@@ -770,11 +1475,7 @@ def view_analysis(analysis_id):
 @login_required
 def delete_analysis(analysis_id):
     """Deletes a specific analysis from history."""
-    analysis = ResumeAnalysis.query.get_or_404(analysis_id)
-
-    if analysis.user_id != current_user.id:
-        flash('You do not have permission to delete this analysis.', 'danger')
-        return redirect(url_for('history'))
+    analysis = ResumeAnalysis.query.filter_by(id=analysis_id, user_id=current_user.id).first_or_404()
 
     try:
         # Note: We are not deleting the associated resume or job description files/entries
@@ -782,6 +1483,10 @@ def delete_analysis(analysis_id):
         # For this setup, we're only deleting the analysis record itself.
         db.session.delete(analysis)
         db.session.commit()
+        try:
+            os.remove(report_path(analysis_id, 'pdf')) # Drop the stored report too
+        except FileNotFoundError:
+            pass
         flash('Analysis deleted successfully!', 'success')
     except Exception as e:
         db.session.rollback()
@@ -799,9 +1504,8 @@ def tips():
 def trends():
     """Renders the trends page with skill and industry insights."""
     try:
-        all_job_descriptions = [jd.content for jd in JobDescription.query.all()]
-        skill_trends = analyze_skill_trends(all_job_descriptions)
-        industry_insights = get_industry_insights(all_job_descriptions)
+        skill_trends = get_skill_trends()
+        industry_insights = get_industry_insights()
     except Exception as e:
         logger.error(f"Error generating trends: {e}")
         skill_trends = {}
@@ -824,7 +1528,7 @@ def uploaded_file(filename):
     # with an analysis record belonging to the current_user to prevent access to
     # other users' uploaded files.
     try:
-        return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+        return send_stored_file(app.config['UPLOAD_FOLDER'], filename, app.config['UPLOADS_ACCEL_REDIRECT'])
     except FileNotFoundError:
         flash('File not found.', 'danger')
         return redirect(url_for('history')) # Or a 404 page
@@ -835,111 +1539,26 @@ def download_report(analysis_id, report_type):
     """Generates and downloads a PDF or CSV report for a given analysis."""
     analysis = ResumeAnalysis.query.options(
         joinedload(ResumeAnalysis.resume),
-        joinedload(ResumeAnalysis.job_description)
-    ).get_or_404(analysis_id)
-
-    if analysis.user_id != current_user.id:
-        flash('You do not have permission to generate a report for this analysis.', 'danger')
-        return redirect(url_for('history'))
-
-    # Helper function to format content for reports
-    def format_list_for_report(data_list):
-        if isinstance(data_list, str):
-            try:
-                # Attempt to load as JSON list
-                parsed_list = json.loads(data_list)
-                if isinstance(parsed_list, list):
-                    return ', '.join(parsed_list)
-                else:
-                    return data_list # Not a list in JSON, return as is
-            except json.JSONDecodeError:
-                return data_list # Not JSON, return as is
-        elif isinstance(data_list, list):
-            return ', '.join(data_list)
-        return str(data_list)
+        joinedload(ResumeAnalysis.job_description),
+        undefer_group('suggestions')
+    ).filter_by(id=analysis_id, user_id=current_user.id).first_or_404()
 
     if report_type == 'pdf':
-        buffer = io.BytesIO()
-        p = canvas.Canvas(buffer, pagesize=letter)
-        width, height = letter
-
-        p.setFont("Helvetica-Bold", 18)
-        p.drawString(50, height - 50, f"Resume Analysis Report for {analysis.resume.original_filename}")
-
-        p.setFont("Helvetica", 10)
-        y_position = height - 80
-
-        def draw_text(text, x, y, font_size=10, bold=False):
-            p.setFont("Helvetica-Bold" if bold else "Helvetica", font_size)
-            p.drawString(x, y, text)
-            return y - font_size - 5 # Return next y position
-
-        y_position = draw_text("Analysis Details:", 50, y_position, 12, True)
-        y_position = draw_text(f"Overall Score: {analysis.overall_score:.2f} (Rank: {analysis.rank_level})", 60, y_position)
-        y_position = draw_text(f"Skills Score: {analysis.skills_score:.2f}", 60, y_position)
-        y_position = draw_text(f"Experience Score: {analysis.experience_score:.2f}", 60, y_position)
-        y_position = draw_text(f"Education Score: {analysis.education_score:.2f}", 60, y_position)
-        y_position -= 10
-
-        y_position = draw_text("Job Description:", 50, y_position, 12, True)
-        y_position = draw_text(f"Title: {analysis.job_description.title}", 60, y_position)
-        y_position = draw_text(f"Content: {analysis.job_description.content[:200]}...", 60, y_position) # Truncate for report
-        y_position = draw_text(f"Required Skills: {format_list_for_report(analysis.job_description.get_skills_list())}", 60, y_position)
-        y_position -= 10
-
-        y_position = draw_text("Resume Details:", 50, y_position, 12, True)
-        y_position = draw_text(f"Filename: {analysis.resume.original_filename}", 60, y_position)
-        y_position = draw_text(f"Uploaded On: {analysis.resume.uploaded_on.strftime('%Y-%m-%d %H:%M')}", 60, y_position)
-        y_position = draw_text(f"Experience: {analysis.resume.experience_years} years", 60, y_position)
-        y_position = draw_text(f"Skills: {format_list_for_report(analysis.resume.get_skills_list())}", 60, y_position)
-        y_position = draw_text(f"Education: {format_list_for_report(analysis.resume.get_education_list())}", 60, y_position)
-        y_position -= 10
-
-        y_position = draw_text("Matched Skills:", 50, y_position, 12, True)
-        y_position = draw_text(format_list_for_report(analysis.get_matched_skills()), 60, y_position)
-        y_position -= 10
-
-        y_position = draw_text("Missing Skills:", 50, y_position, 12, True)
-        y_position = draw_text(format_list_for_report(analysis.get_missing_skills()), 60, y_position)
-        y_position -= 10
-
-        y_position = draw_text("Improvement Suggestions:", 50, y_position, 12, True)
-        for line in analysis.improvements.split('\n'):
-            if y_position < 50: # Check for page overflow
-                p.showPage()
-                y_position = height - 50
-                p.setFont("Helvetica", 10)
-            y_position = draw_text(line, 60, y_position)
-        y_position -= 10
-
-        y_position = draw_text("Skill Gap Suggestions:", 50, y_position, 12, True)
-        for line in analysis.skill_gap_suggestions.split('\n'):
-            if y_position < 50: # Check for page overflow
-                p.showPage()
-                y_position = height - 50
-                p.setFont("Helvetica", 10)
-            y_position = draw_text(line, 60, y_position)
-        y_position -= 10
-
-        p.showPage()
-        p.save()
-
-        buffer.seek(0)
-        filename = f"analysis_report_{analysis_id}.pdf"
-        return Response(buffer.getvalue(),
-                        mimetype='application/pdf',
-                        headers={'Content-Disposition': f'attachment;filename={filename}'})
-
-    elif report_type == 'csv':
-        output = io.StringIO()
-        writer = csv.writer(output)
+        try:
+            # Usually already built in the background when the analysis was viewed
+            future = queue_pdf_report(analysis_id)
+            if future is not None:
+                future.result(timeout=app.config['REPORT_BUILD_TIMEOUT'])
+        except Exception as e:
+            logger.error(f"Error building PDF report for analysis {analysis_id}: {e}", exc_info=True)
+            flash('An error occurred while generating the PDF report.', 'danger')
+            return redirect(url_for('view_analysis', analysis_id=analysis_id))
 
-        writer.writerow(['Report Type', 'Resume Filename', 'Job Title', 'Overall Score',
-                         'Skills Score', 'Experience Score', 'Education Score',
-                         'Matched Skills', 'Missing Skills', 'Improvement Suggestions',
-                         'Skill Gap Suggestions', 'Uploaded On'])
+        return send_stored_file(app.config['REPORTS_FOLDER'], os.path.basename(report_path(analysis_id, 'pdf')),
+                                app.config['REPORTS_ACCEL_REDIRECT'], mimetype='application/pdf', as_attachment=True)
 
-        writer.writerow([
+    elif report_type == 'csv':
+        row = [
             'Single Analysis',
             analysis.resume.original_filename,
             analysis.job_description.title,
@@ -949,14 +1568,23 @@ def download_report(analysis_id, report_type):
             f"{analysis.education_score:.2f}",
             format_list_for_report(analysis.get_matched_skills()),
             format_list_for_report(analysis.get_missing_skills()),
-            analysis.improvements.replace('\n', ' | '), # Flatten for CSV
-            analysis.skill_gap_suggestions.replace('\n', ' | '), # Flatten for CSV
-            analysis.timestamp.strftime('%Y-%m-%d %H:%M:%S')
-        ])
+            (analysis.improvements or '').replace('\n', ' | '), # Flatten for CSV
+            (analysis.skill_gap_suggestions or '').replace('\n', ' | '), # Flatten for CSV
+            analysis.resume.uploaded_at.isoformat(sep=' ', timespec='seconds')
+        ]
+
+        # Stream rows as they are formatted instead of buffering the whole file
+        writer = csv.writer(EchoWriter())
+
+        def generate():
+            yield writer.writerow(['Report Type', 'Resume Filename', 'Job Title', 'Overall Score',
+                                   'Skills Score', 'Experience Score', 'Education Score',
+                                   'Matched Skills', 'Missing Skills', 'Improvement Suggestions',
+                                   'Skill Gap Suggestions', 'Uploaded On'])
+            yield writer.writerow(row)
 
-        output.seek(0)
         filename = f"analysis_report_{analysis_id}.csv"
-        return Response(output.getvalue(),
+        return Response(stream_with_context(generate()),
                         mimetype='text/csv',
                         headers={'Content-Disposition': f'attachment;filename={filename}'})
 
@@ -976,19 +1604,19 @@ def page_not_found(error):
 @app.errorhandler(HTTPException)
 def handle_exception(e):
     """Return JSON instead of HTML for HTTP errors."""
-    # start with the correct headers and status code from the error
-    response = e.get_response()
-    # replace the body with JSON
-    response.data = json.dumps({
-        "code": e.code,
-        "name": e.name,
-        "description": e.description,
-    })
-    response.content_type = "application/json"
+    response = jsonify(code=e.code, name=e.name, description=e.description)
+    response.status_code = e.code
+    # Keep headers the error sets itself (e.g. Allow on 405) without rendering its HTML body
+    for header, value in e.get_headers():
+        if header.lower() != 'content-type':
+            response.headers[header] = value
     return response
 
 if __name__ == '__main__':
     # When running locally, set FLASK_ENV to 'development'
     # This will load DevelopmentConfig from config.py
     os.environ['FLASK_ENV'] = 'development'
+    # The dev server is a single process, so it can upgrade the schema itself
+    with app.app_context():
+        upgrade_schema()
     app.run(debug=True)
\ No newline at end of file
@@ -3,6 +3,7 @@ Configuration settings for RankRite Resume Ranker
 """
 import os
 from datetime import timedelta
+from sqlalchemy.pool import QueuePool
 
 class Config:
     """Base configuration class"""
@@ -20,23 +21,67 @@ class Config:
                               'sqlite:///' + os.path.join(BASE_DIR, 'instance', 'resume_ranker.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
-    # --- THIS IS THE DEBUG PRINT LINE I NEED TO SEE IN YOUR OUTPUT ---
-    print(f"DEBUG (config.py): Database URI set to: {SQLALCHEMY_DATABASE_URI}")
-    # --- END DEBUG PRINT ---
+    # Connection pooling (sizes are per worker process)
+    if SQLALCHEMY_DATABASE_URI.startswith('sqlite'):
+        # Reuse SQLite file connections (and their PRAGMAs) instead of Flask-SQLAlchemy's
+        # default of opening one per request; pooled connections move between threads
+        SQLALCHEMY_ENGINE_OPTIONS = {
+            'poolclass': QueuePool,
+            'pool_size': int(os.environ.get('DB_POOL_SIZE') or 5),
+            'connect_args': {'check_same_thread': False}
+        }
+    else:
+        # Check connections before use and recycle them before server-side idle timeouts
+        SQLALCHEMY_ENGINE_OPTIONS = {
+            'pool_size': int(os.environ.get('DB_POOL_SIZE') or 10),
+            'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW') or 20),
+            'pool_pre_ping': True,
+            'pool_recycle': 1800
+        }
+    # On PostgreSQL, let psycopg2 send batched inserts as multi-row INSERT statements
+    if SQLALCHEMY_DATABASE_URI.startswith('postgres'):
+        SQLALCHEMY_ENGINE_OPTIONS.update({
+            'executemany_mode': 'values_plus_batch',
+            'executemany_values_page_size': 1000
+        })
 
     # File uploads
     # Ensure these paths are also absolute relative to the BASE_DIR for consistency
     UPLOAD_FOLDER = os.path.join(BASE_DIR, 'uploads')
     REPORTS_FOLDER = os.path.join(BASE_DIR, 'reports')
+    TEXT_CACHE_FOLDER = os.path.join(REPORTS_FOLDER, 'text_cache')  # Extracted resume text keyed by file hash
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+    MAX_JOB_DESCRIPTION_LENGTH = 50000  # Characters accepted in a pasted job description
     ALLOWED_EXTENSIONS = {'pdf', 'docx', 'doc'}
+    UPLOAD_WRITE_WORKERS = 4  # Background threads writing accepted uploads to disk
+    REPORT_WORKERS = 2  # Background threads building PDF reports
+    REPORT_BUILD_TIMEOUT = 60  # Seconds a download waits for an in-flight PDF build
+    # Hand file downloads to the front-end server: USE_X_SENDFILE for Apache/lighttpd, or
+    # internal nginx locations aliasing UPLOAD_FOLDER / REPORTS_FOLDER (e.g. /protected_uploads/)
+    # for X-Accel-Redirect
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', 'false').lower() in ['true', 'on', '1']
+    UPLOADS_ACCEL_REDIRECT = os.environ.get('UPLOADS_ACCEL_REDIRECT')
+    REPORTS_ACCEL_REDIRECT = os.environ.get('REPORTS_ACCEL_REDIRECT')
+
+    # Password hashing, as werkzeug's generate_password_hash method ('pbkdf2:<hash>[:<iterations>]')
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'pbkdf2:sha256'
 
     # Session
     PERMANENT_SESSION_LIFETIME = timedelta(hours=24)
+    # Set SESSION_TYPE=redis (with REDIS_URL) to keep sessions and flashes server-side via Flask-Session
+    SESSION_TYPE = os.environ.get('SESSION_TYPE')
+    SESSION_USE_SIGNER = True
+    REDIS_URL = os.environ.get('REDIS_URL') or 'redis://localhost:6379/0'
+
+    # Background analysis queue for /api/check; without a broker the API analyzes in the request
+    CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL')
+    CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND') or CELERY_BROKER_URL
+    TASK_EVENTS_TIMEOUT = int(os.environ.get('TASK_EVENTS_TIMEOUT') or 300)  # Seconds an /events stream waits for its task
 
     # Application settings
     JOBS_PER_PAGE = 10
     RESUMES_PER_PAGE = 20
+    HISTORY_PER_PAGE = 50
 
     # NLP Settings
     MIN_SIMILARITY_THRESHOLD = 0.1
@@ -69,6 +114,8 @@ class TestingConfig(Config):
     TESTING = True
     WTF_CSRF_ENABLED = False
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:' # Use in-memory DB for tests
+    SQLALCHEMY_ENGINE_OPTIONS = {} # Flask-SQLAlchemy gives in-memory SQLite a single shared connection
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000' # Cheap hashing; test passwords protect nothing
 
 # Configuration dictionary
 config = {
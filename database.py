@@ -4,13 +4,126 @@
 """
 Database models and utilities for RankRite Resume Ranker
 """
+from flask import current_app
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
+from sqlalchemy import and_, case, event, func, inspect, or_, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import deferred, undefer, validates
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+from bisect import bisect_right
+from collections import OrderedDict
+import hashlib
 import json
-
-db = SQLAlchemy()
+import sqlite3
+import threading
+try:
+    import orjson  # Faster JSON encoding/decoding for the JSON text columns
+except ImportError:
+    orjson = None
+
+# Flask-SQLAlchemy already scopes db.session to the app context and removes it on teardown.
+# Objects stay loaded after commit (the session ends with the request anyway), and queries
+# don't flush pending objects implicitly: routes flush once, explicitly, before they need ids
+db = SQLAlchemy(session_options={'expire_on_commit': False, 'autoflush': False})
+
+def hash_content(content):
+    """Get a short fingerprint of text content for indexed lookups"""
+    return hashlib.blake2b(content.encode('utf-8'), digest_size=16).hexdigest()
+
+@event.listens_for(Engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Use write-ahead logging on SQLite so batch commits don't each wait on a full fsync"""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')  # Safe with WAL; only the last commits can be lost on power failure
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.execute('PRAGMA mmap_size=268435456')
+    cursor.close()
+
+def load_json(raw):
+    """Decode a JSON text column value, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+def dump_json(value):
+    """Encode a value for a JSON text column, with orjson when it is installed"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY).decode('utf-8')
+        except TypeError:
+            pass  # e.g. a type orjson doesn't know; the stdlib encoder decides
+    return json.dumps(value)
+
+RESUME_PREVIEW_LENGTH = 200
+
+def get_content_preview(content):
+    """Get the short preview of a resume's text that list views show instead of the full content"""
+    if len(content) > RESUME_PREVIEW_LENGTH:
+        return content[:RESUME_PREVIEW_LENGTH] + '...'
+    return content
+
+# Per-process LRU of (created_by, content_hash) -> job description id for find_by_content
+JD_ID_CACHE_SIZE = 1024
+_jd_id_cache = OrderedDict()
+_jd_id_cache_lock = threading.Lock()
+
+def load_json_column(instance, column_name, default):
+    """Decode a JSON text column, reusing the decoded value while the stored text is unchanged.
+
+    The decoded value is shared between calls, so callers should copy it before mutating.
+    """
+    raw = getattr(instance, column_name)
+    if not raw:
+        return default
+
+    cache = getattr(instance, '_json_cache', None)
+    if cache is None:
+        cache = instance._json_cache = {}
+
+    cached = cache.get(column_name)
+    if cached is not None and cached[0] is raw:
+        return cached[1]
+
+    try:
+        value = load_json(raw)
+    except (TypeError, ValueError):
+        value = default
+    cache[column_name] = (raw, value)
+    return value
+
+# Rank bands for an overall score between 0.0 and 1.0: a score at or above
+# RANK_THRESHOLDS[i] (and below the next threshold) gets RANK_LEVELS[i + 1]
+RANK_THRESHOLDS = (0.50, 0.75, 0.90)
+RANK_LEVELS = ("Needs Improvement", "Moderate Match", "Strong Match", "Excellent Match")
+RANK_COLORS = ("danger", "warning", "primary", "success")  # Bootstrap color classes
+
+def get_rank(score):
+    """Get (rank level, Bootstrap color class) for an overall score between 0.0 and 1.0"""
+    band = bisect_right(RANK_THRESHOLDS, score)
+    return RANK_LEVELS[band], RANK_COLORS[band]
+
+def get_rank_level(score):
+    """Get rank level for an overall score between 0.0 and 1.0"""
+    return get_rank(score)[0]
+
+def get_rank_color(score):
+    """Get Bootstrap color class for an overall score between 0.0 and 1.0"""
+    return get_rank(score)[1]
+
+def get_rank_fields(score):
+    """Get the stored display columns of a ResumeAnalysis for an overall score between 0.0 and 1.0"""
+    rank_level, rank_color = get_rank(score)
+    return {
+        'overall_score_pct': round(score * 100, 2),
+        'rank_level': rank_level,
+        'rank_color': rank_color
+    }
 
 class User(UserMixin, db.Model):
     """User model for authentication"""
@@ -31,7 +144,9 @@ class User(UserMixin, db.Model):
 
     def set_password(self, password):
         """Set password hash"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = generate_password_hash(
+            password, method=current_app.config.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256')
+        )
 
     def check_password(self, password):
         """Check password against hash"""
@@ -64,28 +179,111 @@ class JobDescription(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     company = db.Column(db.String(100), nullable=True)
-    content = db.Column(db.Text, nullable=False)
+    content = deferred(db.Column(db.Text, nullable=False))  # Loaded on first access (or with undefer)
+    content_hash = db.Column(db.String(32), nullable=True, index=True)  # Set automatically from content
     skills_required = db.Column(db.Text, nullable=True)  # JSON string
     experience_required = db.Column(db.String(50), nullable=True)
     education_required = db.Column(db.String(100), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
 
+    __table_args__ = (
+        db.Index('ix_jd_createdby_contenthash', 'created_by', 'content_hash'),
+    )
+
     # Relationships
     analyses = db.relationship('ResumeAnalysis', backref='job_description', lazy=True)
 
+    @validates('content')
+    def _update_content_hash(self, key, content):
+        """Keep content_hash in sync whenever content is assigned"""
+        self.content_hash = hash_content(content) if content is not None else None
+        return content
+
+    @classmethod
+    def find_by_content(cls, content, created_by):
+        """Find a user's existing job description with the same content.
+
+        Filters on the indexed content hash and confirms the match in Python,
+        so the full text never has to be compared by the database. Matches are
+        remembered per process, so repeat submissions load the row by primary key.
+        """
+        content_hash = hash_content(content)
+        cache_key = (created_by, content_hash)
+
+        # Recently matched JDs are loaded straight by primary key
+        with _jd_id_cache_lock:
+            cached_id = _jd_id_cache.get(cache_key)
+            if cached_id is not None:
+                _jd_id_cache.move_to_end(cache_key)
+        if cached_id is not None:
+            job_description = cls.query.get(cached_id)
+            if job_description is not None and job_description.created_by == created_by \
+                    and job_description.content_hash == content_hash:
+                return job_description
+            # Deleted or changed since it was cached
+            with _jd_id_cache_lock:
+                _jd_id_cache.pop(cache_key, None)
+
+        candidates = cls.query.options(undefer(cls.content)).filter_by(created_by=created_by, content_hash=content_hash).all()
+        for job_description in candidates:
+            if job_description.content == content:
+                with _jd_id_cache_lock:
+                    _jd_id_cache[cache_key] = job_description.id
+                    if len(_jd_id_cache) > JD_ID_CACHE_SIZE:
+                        _jd_id_cache.popitem(last=False)
+                return job_description
+        return None
+
+    @classmethod
+    def get_or_create(cls, content, created_by, title, skills_list):
+        """Get the user's job description with this content, or add a new one to the session.
+
+        New rows aren't flushed here; they go out with the resumes and analyses
+        that reference them in the caller's single flush.
+        """
+        job_description = cls.find_by_content(content, created_by)
+        if job_description is None:
+            job_description = cls(title=title, content=content, created_by=created_by)
+            job_description.set_skills_list(skills_list)
+            db.session.add(job_description)
+        return job_description
+
+    @classmethod
+    def find_skills_by_content(cls, content):
+        """Find skills already extracted for the same content by any user.
+
+        Returns None when no job description with this content has been saved,
+        so callers can tell a cache miss apart from a JD with no skills.
+        """
+        candidate = db.session.query(cls.content, cls.skills_required).filter(
+            cls.content_hash == hash_content(content),
+            cls.skills_required.isnot(None)
+        ).first()
+        if candidate is None or candidate.content != content:
+            return None
+        try:
+            return load_json(candidate.skills_required)
+        except ValueError:
+            return None
+
+    @staticmethod
+    def decode_skills(skills_required):
+        """Decode a skills_required JSON value (e.g. from a column-only query) into a list"""
+        if not skills_required:
+            return []
+        try:
+            return load_json(skills_required)
+        except ValueError:  # Corrupt JSON (json's and orjson's decode errors are ValueErrors)
+            return []
+
     def get_skills_list(self):
         """Get skills as list"""
-        if self.skills_required:
-            try:
-                return json.loads(self.skills_required)
-            except:
-                return []
-        return []
+        return load_json_column(self, 'skills_required', [])
 
     def set_skills_list(self, skills_list):
         """Set skills from list"""
-        self.skills_required = json.dumps(skills_list)
+        self.skills_required = dump_json(skills_list)
 
     def to_dict(self):
         """Convert to dictionary"""
@@ -111,7 +309,9 @@ class Resume(db.Model):
     filename = db.Column(db.String(255), nullable=False)
     original_filename = db.Column(db.String(255), nullable=False)
     file_path = db.Column(db.String(500), nullable=False)
-    content = db.Column(db.Text, nullable=False)
+    content = deferred(db.Column(db.Text, nullable=False))  # Loaded on first access (or with undefer)
+    content_hash = db.Column(db.String(32), nullable=True)  # Set automatically from content
+    content_preview = db.Column(db.String(RESUME_PREVIEW_LENGTH + 3), nullable=True)  # Set automatically from content
 
     # Extracted information
     skills = db.Column(db.Text, nullable=True)  # JSON string
@@ -125,47 +325,44 @@ class Resume(db.Model):
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     uploaded_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
 
+    __table_args__ = (
+        db.Index('ix_resume_filename_uploader', 'uploaded_by', 'filename'),
+        db.Index('ix_resume_uploader_contenthash', 'uploaded_by', 'content_hash'),
+    )
+
     # Relationships
     analyses = db.relationship('ResumeAnalysis', backref='resume', lazy=True)
 
+    @validates('content')
+    def _update_content_hash(self, key, content):
+        """Keep content_hash and content_preview in sync whenever content is assigned"""
+        self.content_hash = hash_content(content) if content is not None else None
+        self.content_preview = get_content_preview(content) if content is not None else None
+        return content
+
     def get_skills_list(self):
         """Get skills as list"""
-        if self.skills:
-            try:
-                return json.loads(self.skills)
-            except:
-                return []
-        return []
+        return load_json_column(self, 'skills', [])
 
     def set_skills_list(self, skills_list):
         """Set skills from list"""
-        self.skills = json.dumps(skills_list)
+        self.skills = dump_json(skills_list)
 
     def get_education_list(self):
         """Get education as list"""
-        if self.education:
-            try:
-                return json.loads(self.education)
-            except:
-                return []
-        return []
+        return load_json_column(self, 'education', [])
 
     def set_education_list(self, education_list):
         """Set education from list"""
-        self.education = json.dumps(education_list)
+        self.education = dump_json(education_list)
 
     def get_contact_info(self):
         """Get contact info as dict"""
-        if self.contact_info:
-            try:
-                return json.loads(self.contact_info)
-            except:
-                return {}
-        return {}
+        return load_json_column(self, 'contact_info', {})
 
     def set_contact_info(self, contact_dict):
         """Set contact info from dict"""
-        self.contact_info = json.dumps(contact_dict)
+        self.contact_info = dump_json(contact_dict)
 
     def to_dict(self):
         """Convert to dictionary"""
@@ -173,7 +370,7 @@ class Resume(db.Model):
             'id': self.id,
             'filename': self.filename,
             'original_filename': self.original_filename,
-            'content_preview': self.content[:200] + '...' if len(self.content) > 200 else self.content,
+            'content_preview': self.content_preview,
             'skills': self.get_skills_list(),
             'experience_years': self.experience_years,
             'education': self.get_education_list(),
@@ -197,6 +394,9 @@ class ResumeAnalysis(db.Model):
 
     # Matching scores
     overall_score = db.Column(db.Float, nullable=False)
+    overall_score_pct = db.Column(db.Float, nullable=True)  # Set automatically from overall_score (0-100)
+    rank_level = db.Column(db.String(32), nullable=True)  # Set automatically from overall_score
+    rank_color = db.Column(db.String(16), nullable=True)  # Set automatically from overall_score
     skills_score = db.Column(db.Float, nullable=False)
     experience_score = db.Column(db.Float, nullable=False)
     education_score = db.Column(db.Float, nullable=False)
@@ -204,71 +404,46 @@ class ResumeAnalysis(db.Model):
     # Detailed analysis
     matched_skills = db.Column(db.Text, nullable=True)  # JSON string
     missing_skills = db.Column(db.Text, nullable=True)  # JSON string
-    skill_gap_suggestions = db.Column(db.Text, nullable=True)
-    strengths = db.Column(db.Text, nullable=True)
-    improvements = db.Column(db.Text, nullable=True)
+    # Suggestion text is loaded together on first access (or with undefer_group('suggestions'))
+    skill_gap_suggestions = deferred(db.Column(db.Text, nullable=True), group='suggestions')
+    strengths = deferred(db.Column(db.Text, nullable=True), group='suggestions')
+    improvements = deferred(db.Column(db.Text, nullable=True), group='suggestions')
 
     # Analysis metadata
     analysis_method = db.Column(db.String(50), default='tfidf', nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
+    __table_args__ = (
+        db.Index('ix_analysis_user_created', 'user_id', 'created_at', 'id'),
+        # Foreign keys aren't indexed automatically on SQLite; these serve the
+        # resume/JD relationship loads and repeat-comparison lookups
+        db.Index('ix_analysis_resume', 'resume_id'),
+        db.Index('ix_analysis_job_description', 'job_description_id'),
+    )
+
     def get_matched_skills(self):
         """Get matched skills as list"""
-        if self.matched_skills:
-            try:
-                return json.loads(self.matched_skills)
-            except:
-                return []
-        return []
+        return load_json_column(self, 'matched_skills', [])
 
     def set_matched_skills(self, skills_list):
         """Set matched skills from list"""
-        self.matched_skills = json.dumps(skills_list)
+        self.matched_skills = dump_json(skills_list)
 
     def get_missing_skills(self):
         """Get missing skills as list"""
-        if self.missing_skills:
-            try:
-                return json.loads(self.missing_skills)
-            except:
-                return []
-        return []
+        return load_json_column(self, 'missing_skills', [])
 
     def set_missing_skills(self, skills_list):
         """Set missing skills from list"""
-        self.missing_skills = json.dumps(skills_list)
-
-    # IMPORTANT: Add @property decorator here
-    @property
-    def rank_level(self):
-        """Get rank level based on overall score"""
-        # Assuming overall_score is a float between 0.0 and 1.0 (e.g., 0.85)
-        # If it's already scaled to 0-100, adjust thresholds accordingly.
-        # Based on app.py's to_dict() returning score * 100,
-        # and ResumeAnalysis() in app.py expecting a score,
-        # let's assume overall_score is 0-1 and this method
-        # scales it for display.
-        if self.overall_score >= 0.90:
-            return "Excellent Match"
-        elif self.overall_score >= 0.75:
-            return "Strong Match"
-        elif self.overall_score >= 0.50:
-            return "Moderate Match"
-        else:
-            return "Needs Improvement"
-
-    # IMPORTANT: Add @property decorator here
-    @property
-    def rank_color(self):
-        """Get color class based on rank"""
-        if self.overall_score >= 0.90:
-            return "success"
-        elif self.overall_score >= 0.75:
-            return "primary"
-        elif self.overall_score >= 0.50:
-            return "warning"
-        else:
-            return "danger"
+        self.missing_skills = dump_json(skills_list)
+
+    @validates('overall_score')
+    def _update_rank(self, key, overall_score):
+        """Store the display percentage and rank whenever overall_score is assigned"""
+        if overall_score is not None:
+            for key, value in get_rank_fields(overall_score).items():
+                setattr(self, key, value)
+        return overall_score
 
     def to_dict(self):
         """Convert to dictionary"""
@@ -276,7 +451,7 @@ class ResumeAnalysis(db.Model):
             'id': self.id,
             'resume_id': self.resume_id,
             'job_description_id': self.job_description_id,
-            'overall_score': round(self.overall_score * 100, 2), # Scale for display (0-100)
+            'overall_score': self.overall_score_pct, # Scaled for display (0-100)
             'skills_score': round(self.skills_score * 100, 2),
             'experience_score': round(self.experience_score * 100, 2),
             'education_score': round(self.education_score * 100, 2),
@@ -285,11 +460,93 @@ class ResumeAnalysis(db.Model):
             'skill_gap_suggestions': self.skill_gap_suggestions,
             'strengths': self.strengths,
             'improvements': self.improvements,
-            'rank_level': self.rank_level,  # Now correctly accessed as a property
-            'rank_color': self.rank_color,  # Now correctly accessed as a property
+            'rank_level': self.rank_level,
+            'rank_color': self.rank_color,
             'created_at': self.created_at.isoformat()
         }
 
+    @classmethod
+    def bulk_create(cls, rows):
+        """Add analyses given as column dicts with one executemany INSERT, without building ORM objects.
+
+        The bulk path skips the overall_score validator and the set_* helpers, so the
+        rank columns are filled in and matched/missing skill lists JSON-encoded here.
+        Each dict is updated in place, including its new 'id'; committing is left to
+        the caller.
+        """
+        if not rows:
+            return rows
+        for row in rows:
+            row.update(get_rank_fields(row['overall_score']))
+            for column in ('matched_skills', 'missing_skills'):
+                if isinstance(row.get(column), list):
+                    row[column] = dump_json(row[column])
+
+        # return_defaults would make SQLAlchemy insert row by row to read back each id,
+        # so the new ids are read with one query for rows above the previous highest id
+        last_id = db.session.query(func.max(cls.id)).scalar() or 0
+        db.session.bulk_insert_mappings(cls, rows)
+        new_ids = db.session.query(cls.id).filter(
+            cls.id > last_id,
+            cls.user_id.in_({row['user_id'] for row in rows}),
+            cls.job_description_id.in_({row['job_description_id'] for row in rows})
+        ).order_by(cls.id).limit(len(rows))
+        for row, (new_id,) in zip(rows, new_ids):
+            row['id'] = new_id
+        return rows
+
+    @classmethod
+    def list_dicts(cls, user_id, before=None, before_id=None, limit=None):
+        """Yield a user's analyses, newest first, as plain dicts.
+
+        Each dict has the same keys as to_dict() plus 'resume_filename' and
+        'job_title'. Only the needed columns are selected, so no ORM objects
+        are built for list endpoints. before/before_id are the (created_at, id)
+        of the last row of the previous page; the seek and ordering both use
+        ix_analysis_user_created, so every page costs the same.
+        """
+        rows = db.session.query(
+            cls.id, cls.resume_id, cls.job_description_id, cls.overall_score_pct,
+            cls.skills_score, cls.experience_score, cls.education_score,
+            cls.matched_skills, cls.missing_skills, cls.skill_gap_suggestions,
+            cls.strengths, cls.improvements, cls.rank_level, cls.rank_color, cls.created_at,
+            Resume.original_filename, JobDescription.title
+        ).join(Resume, cls.resume_id == Resume.id).join(
+            JobDescription, cls.job_description_id == JobDescription.id
+        ).filter(cls.user_id == user_id)
+        if before is not None:
+            if before_id is not None:
+                rows = rows.filter(or_(
+                    cls.created_at < before,
+                    and_(cls.created_at == before, cls.id < before_id)
+                ))
+            else:
+                rows = rows.filter(cls.created_at < before)
+        rows = rows.order_by(cls.created_at.desc(), cls.id.desc())
+        if limit is not None:
+            rows = rows.limit(limit)
+
+        for row in rows:
+            yield {
+                'id': row.id,
+                'resume_id': row.resume_id,
+                'job_description_id': row.job_description_id,
+                'overall_score': row.overall_score_pct, # Scaled for display (0-100)
+                'skills_score': round(row.skills_score * 100, 2),
+                'experience_score': round(row.experience_score * 100, 2),
+                'education_score': round(row.education_score * 100, 2),
+                'matched_skills': JobDescription.decode_skills(row.matched_skills),
+                'missing_skills': JobDescription.decode_skills(row.missing_skills),
+                'skill_gap_suggestions': row.skill_gap_suggestions,
+                'strengths': row.strengths,
+                'improvements': row.improvements,
+                'rank_level': row.rank_level,
+                'rank_color': row.rank_color,
+                'created_at': row.created_at.isoformat(),
+                'resume_filename': row.original_filename,
+                'job_title': row.title
+            }
+
     def __repr__(self):
         return f'<ResumeAnalysis {self.id}: {self.overall_score:.2%}>'
 
@@ -303,8 +560,7 @@ def init_db(app):
         db.create_all()
 
         # Create default admin user if not exists
-        admin_user = User.query.filter_by(username='admin').first()
-        if not admin_user:
+        if not db.session.query(User.query.filter_by(username='admin').exists()).scalar():
             admin = User(
                 username='admin',
                 email='admin@rankrite.com',
@@ -316,11 +572,80 @@ def init_db(app):
             db.session.commit()
             print("Created default admin user (username: admin, password: admin123)")
 
+def upgrade_schema():
+    """Add columns and indexes introduced after a table was first created.
+
+    db.create_all() only creates missing tables, so databases created by an
+    older version of the app are brought up to date here. Run it once per
+    deploy with `flask upgrade-db` rather than from every worker at import.
+    Each statement runs in its own transaction, and a column or index that
+    another process added first counts as done.
+    """
+    inspector = inspect(db.engine)
+
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing_columns:
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                try:
+                    with db.engine.begin() as connection:
+                        connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                except OperationalError as e:
+                    if 'duplicate column' not in str(e).lower():
+                        raise
+
+        for index in table.indexes:
+            try:
+                with db.engine.begin() as connection:
+                    index.create(bind=connection, checkfirst=True)
+            except OperationalError as e:
+                if 'already exists' not in str(e).lower():
+                    raise
+
+    # Backfill content hashes for job descriptions stored before the column existed
+    missing_hashes = JobDescription.query.options(undefer(JobDescription.content)).filter(JobDescription.content_hash.is_(None)).all()
+    for job_description in missing_hashes:
+        job_description.content_hash = hash_content(job_description.content)
+    if missing_hashes:
+        db.session.commit()
+
+    # Backfill content hashes for resumes stored before the column existed
+    missing_resume_hashes = Resume.query.options(undefer(Resume.content)).filter(Resume.content_hash.is_(None)).all()
+    for resume in missing_resume_hashes:
+        resume.content_hash = hash_content(resume.content)
+    if missing_resume_hashes:
+        db.session.commit()
+
+    # Backfill previews for resumes stored before the column existed
+    missing_previews = Resume.query.options(undefer(Resume.content)).filter(Resume.content_preview.is_(None)).all()
+    for resume in missing_previews:
+        resume.content_preview = get_content_preview(resume.content)
+    if missing_previews:
+        db.session.commit()
+
+    # Backfill stored ranks for analyses saved before those columns existed
+    missing_ranks = ResumeAnalysis.query.filter(ResumeAnalysis.rank_level.is_(None)).all()
+    for analysis in missing_ranks:
+        analysis.overall_score = analysis.overall_score  # Re-runs the overall_score validator
+    if missing_ranks:
+        db.session.commit()
+
 def get_user_stats(user_id):
     """Get user statistics"""
-    analyses = ResumeAnalysis.query.filter_by(user_id=user_id).all()
-
-    if not analyses:
+    # Count, average, best and this month's count in one aggregate query
+    month_start = datetime.utcnow().replace(day=1)
+    total_analyses, avg_score, best_score, recent_analyses = db.session.query(
+        func.count(ResumeAnalysis.id),
+        func.avg(ResumeAnalysis.overall_score), # Use the raw score here
+        func.max(ResumeAnalysis.overall_score),
+        func.sum(case((ResumeAnalysis.created_at >= month_start, 1), else_=0))
+    ).filter(ResumeAnalysis.user_id == user_id).one()
+
+    if not total_analyses:
         return {
             'total_analyses': 0,
             'avg_score': 0,
@@ -328,14 +653,9 @@ def get_user_stats(user_id):
             'recent_analyses': 0
         }
 
-    scores = [a.overall_score for a in analyses] # Use the raw score here
-    recent_analyses = ResumeAnalysis.query.filter_by(user_id=user_id)\
-        .filter(ResumeAnalysis.created_at >= datetime.utcnow().replace(day=1))\
-        .count()
-
     return {
-        'total_analyses': len(analyses),
-        'avg_score': round(sum(scores) / len(scores) * 100, 1), # Scale for display (0-100)
-        'best_score': round(max(scores) * 100, 1), # Scale for display (0-100)
+        'total_analyses': total_analyses,
+        'avg_score': round(avg_score * 100, 1), # Scale for display (0-100)
+        'best_score': round(best_score * 100, 1), # Scale for display (0-100)
         'recent_analyses': recent_analyses
     }
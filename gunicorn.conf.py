@@ -0,0 +1,38 @@
+"""
+Gunicorn configuration for RankRite
+
+Run with: gunicorn -c gunicorn.conf.py app:app
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# The analysis routes spend most of their wall time blocked on uploads,
+# PDF/DOCX parsing and database commits, so cooperative gevent workers keep
+# serving other requests while one is waiting on IO. The gevent worker
+# monkey-patches the standard library before app.py is imported, so the app
+# itself does not need to call gevent.monkey.patch_all().
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gevent')
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+
+# Large multi-resume uploads can take a while to parse
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+
+# Optionally import the app once in the master so the skills automaton and spaCy
+# model built by ResumeProcessor are shared copy-on-write by every worker
+# instead of being loaded per worker. Off by default: the app is then imported
+# before gevent monkey-patches the workers.
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'false').lower() in ['true', 'on', '1']
+
+
+def post_fork(server, worker):
+    """Drop database connections inherited from a preloaded master."""
+    if preload_app:
+        from app import app, db
+        with app.app_context():
+            db.engine.dispose()
+
+accesslog = '-'
+errorlog = '-'
@@ -1,9 +1,60 @@
 import os
+import atexit
+import copy
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+try:
+    import orjson
+except ImportError:
+    orjson = None
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# Shared by every handler; built once at import
+LOG_FORMATTER = logging.Formatter(
+    '[%(asctime)s] %(levelname)s in %(module)s: %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line, for log files read by aggregators"""
+
+    def format(self, record):
+        entry = {
+            't': record.created,  # Epoch seconds
+            'lvl': record.levelname,
+            'mod': record.module,
+            'msg': record.getMessage()
+        }
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        if orjson is not None:
+            return orjson.dumps(entry).decode('utf-8')
+        return json.dumps(entry)
+
+# Log files get JSON lines; the console keeps the readable LOG_FORMATTER
+JSON_LOG_FORMATTER = JsonFormatter()
+
+class TracebackQueueHandler(QueueHandler):
+    """QueueHandler that keeps a record's traceback in exc_text instead of folding it into msg"""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = LOG_FORMATTER.formatException(record.exc_info)
+        # Queue only rendered text, as QueueHandler.prepare() does
+        record.msg, record.args, record.exc_info = record.message, None, None
+        return record
 
 def setup_logging(app):
-    """Configure logging for the application"""
+    """Configure logging for the application (only the first call sets up handlers)"""
+    app_logger = logging.getLogger('rankrite')
+    if getattr(setup_logging, '_done', False):
+        return app_logger
+
     # Create logs directory if it doesn't exist
     logs_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs')
     os.makedirs(logs_dir, exist_ok=True)
@@ -11,50 +62,50 @@ def setup_logging(app):
     # Configure the root logger
     log_level = logging.DEBUG if app.config.get('DEBUG', False) else logging.INFO
     
-    # Create a formatter
-    formatter = logging.Formatter(
-        '[%(asctime)s] %(levelname)s in %(module)s: %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    
-    # Configure file handler for all logs
+    # Configure file handler for all logs (delay: the file is opened on the first record)
     file_handler = RotatingFileHandler(
         os.path.join(logs_dir, 'rankrite.log'),
         maxBytes=10485760,  # 10MB
-        backupCount=10
+        backupCount=10,
+        delay=True
     )
     file_handler.setLevel(log_level)
-    file_handler.setFormatter(formatter)
+    file_handler.setFormatter(JSON_LOG_FORMATTER)
     
     # Configure error file handler for errors only
     error_file_handler = RotatingFileHandler(
         os.path.join(logs_dir, 'error.log'),
         maxBytes=10485760,  # 10MB
-        backupCount=10
+        backupCount=10,
+        delay=True
     )
     error_file_handler.setLevel(logging.ERROR)
-    error_file_handler.setFormatter(formatter)
+    error_file_handler.setFormatter(JSON_LOG_FORMATTER)
     
     # Configure console handler
     console_handler = logging.StreamHandler()
     console_handler.setLevel(log_level)
-    console_handler.setFormatter(formatter)
+    console_handler.setFormatter(LOG_FORMATTER)
     
-    # Get the application logger
-    app_logger = logging.getLogger('rankrite')
+    # Configure the application logger
     app_logger.setLevel(log_level)
     
     # Remove existing handlers to avoid duplicates
     app_logger.handlers = []
     
-    # Add handlers to the logger
-    app_logger.addHandler(file_handler)
-    app_logger.addHandler(error_file_handler)
-    app_logger.addHandler(console_handler)
+    # Requests only enqueue records; a listener thread does the file and console writes
+    log_queue = queue.SimpleQueue()
+    app_logger.addHandler(TracebackQueueHandler(log_queue))
+    listener = QueueListener(log_queue, file_handler, error_file_handler, console_handler,
+                             respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)  # Flush queued records on exit
     
     # Set propagation to False to avoid duplicate logs
     app_logger.propagate = False
     
+    setup_logging._done = True
+
     # Log application startup
     app_logger.info('Application startup')
     
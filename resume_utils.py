@@ -3,10 +3,21 @@
 Resume processing and ranking utilities for RankRite
 """
 import os
+import io
 import re
+import copy
+import functools
+import hashlib
+import threading
+import zipfile
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
 import fitz  # PyMuPDF
+try:
+    import ahocorasick  # pyahocorasick
+except ImportError:
+    ahocorasick = None
 import docx2txt
-from docx import Document
 import spacy
 import pandas as pd
 import numpy as np
@@ -21,23 +32,187 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _cached_extraction(method):
+    """Memoize an extract_* method on a fingerprint of its input text.
+
+    Keys are blake2b digests so the cache doesn't keep whole resumes alive,
+    and results are copied on the way out so callers can't mutate the cached value.
+    """
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, text):
+        if not text:
+            return method(self, text)
+
+        cached = self.get_cached_extraction(name, text)
+        if cached is not None:
+            return cached
+
+        result = method(self, text)
+        self.cache_extraction(name, text, result)
+        return copy.deepcopy(result)
+
+    return wrapper
+
+# Patterns used by the extract_* methods, compiled once at import
+_EMAIL_RE = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+# Separators and parentheses are optional, so this also covers bare 10-digit numbers
+_PHONE_RE = re.compile(r'(?:\+\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}')
+_LINKEDIN_RE = re.compile(r'linkedin\.com/in/[\w-]+', re.IGNORECASE)
+_GITHUB_RE = re.compile(r'github\.com/[\w-]+', re.IGNORECASE)
+# Year phrases ("5+ years of experience", "experience: 5 years") and date ranges in one pass.
+# The trailing words and the range end are lookaheads so the next match can start there,
+# e.g. "2015 - 2018 - present" yields both ranges.
+_EXPERIENCE_RE = re.compile(
+    r'(?P<years>\d+)\+?\s*years?(?=\s+(?:(?:of\s+)?experience|in|working|professional))'
+    r'|experience\s*:?\s*(?P<stated>\d+)\+?\s*years?'
+    r'|(?P<start>\d{4})\s*[-–]\s*(?=(?P<end>\d{4}|present|current))',
+    re.IGNORECASE
+)
+_DEGREE_RES = tuple(re.compile(pattern) for pattern in [
+    r'(bachelor|master|phd|doctorate|associate|diploma|certificate|bs|ba|ms|ma|mba|btech|mtech|bsc|msc)\s+(?:of\s+|in\s+)?([a-z\s]+)',
+    r'(bachelor|master|phd|doctorate|associate|diploma|certificate|bs|ba|ms|ma|mba|btech|mtech|bsc|msc)(?:\s+degree)?(?:\s+in\s+([a-z\s]+))?',
+])
+# Degree keyword -> level, for comparing a resume's education against a job's requirement
+_DEGREE_HIERARCHY = {
+    'associate': 1, 'diploma': 1, 'certificate': 1,
+    'bachelor': 2, 'bs': 2, 'ba': 2, 'btech': 2, 'bsc': 2,
+    'master': 3, 'ms': 3, 'ma': 3, 'mba': 3, 'mtech': 3, 'msc': 3,
+    'phd': 4, 'doctorate': 4
+}
+_NON_WORD_RE = re.compile(r'[^\w\s]')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+def _precomputed_terms(terms):
+    """TfidfVectorizer analyzer for documents that are already lists of terms"""
+    return terms
+
+_W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+# Text equivalents of the run children that aren't w:t (python-docx maps them the same way)
+_DOCX_RUN_CHARS = {_W_NS + 'tab': '\t', _W_NS + 'ptab': '\t', _W_NS + 'cr': '\n', _W_NS + 'noBreakHyphen': '-'}
+
+def _docx_run_text(run):
+    """Text of a w:r element"""
+    parts = []
+    for child in run:
+        if child.tag == _W_NS + 't':
+            parts.append(child.text or '')
+        elif child.tag == _W_NS + 'br':
+            # Only line breaks become text; page and column breaks add nothing
+            if child.get(_W_NS + 'type', 'textWrapping') == 'textWrapping':
+                parts.append('\n')
+        else:
+            parts.append(_DOCX_RUN_CHARS.get(child.tag, ''))
+    return ''.join(parts)
+
+def _docx_paragraph_text(paragraph):
+    """Text of a w:p element: its runs, including those inside hyperlinks"""
+    parts = []
+    for child in paragraph:
+        if child.tag == _W_NS + 'r':
+            parts.append(_docx_run_text(child))
+        elif child.tag == _W_NS + 'hyperlink':
+            parts.extend(_docx_run_text(run) for run in child.iterfind(_W_NS + 'r'))
+    return ''.join(parts)
+
+def _iter_docx_paragraphs(source):
+    """Stream the text of each body-level paragraph in a .docx (a path or file-like object)"""
+    with zipfile.ZipFile(source) as archive, archive.open('word/document.xml') as xml_file:
+        depth = 0
+        for event, elem in ET.iterparse(xml_file, events=('start', 'end')):
+            if event == 'start':
+                depth += 1
+                continue
+            depth -= 1
+            # Direct children of w:body (document > body > child); tables etc. are skipped
+            if depth == 2:
+                if elem.tag == _W_NS + 'p':
+                    yield _docx_paragraph_text(elem)
+                elem.clear()
+
+def _is_word_boundary(text, index):
+    """Mirror regex \\b: exactly one side of the position is a word character"""
+    before = index > 0 and (text[index - 1].isalnum() or text[index - 1] == '_')
+    after = index < len(text) and (text[index].isalnum() or text[index] == '_')
+    return before != after
+
+@functools.lru_cache(maxsize=1)
+def _get_spacy_model():
+    """Load the spaCy model once per process, or return None if it isn't installed"""
+    try:
+        # Only NER is used (see _extract_skills_with_spacy); skip loading the rest of the pipeline
+        return spacy.load(
+            "en_core_web_sm",
+            exclude=["tagger", "parser", "senter", "attribute_ruler", "lemmatizer"]
+        )
+    except OSError:
+        logger.warning("spaCy model 'en_core_web_sm' not found. Using basic processing.")
+        return None
+
 class ResumeProcessor:
     """Main class for processing and ranking resumes"""
     
-    def __init__(self):
-        """Initialize the processor"""
+    # Number of extraction results (across all extract_* methods) kept in memory
+    EXTRACTION_CACHE_SIZE = 4096
+    
+    def __init__(self, lazy_spacy=True):
+        """Initialize the processor
+
+        With lazy_spacy, spaCy NER only runs on job descriptions (extract_skills_deep);
+        resumes get the much cheaper skills-database match alone.
+        """
         self.nlp = None
+        self.lazy_spacy = lazy_spacy
+        self._extraction_cache = OrderedDict()
+        self._extraction_cache_lock = threading.Lock()
         self.skills_database = self._load_skills_database()
         self.education_keywords = self._load_education_keywords()
+        self._skill_automaton = self._build_skill_automaton()
+        self._skill_regex, self._skill_order = (
+            self._build_skill_regex() if self._skill_automaton is None else (None, None)
+        )
+        # Same tokenization the per-comparison TfidfVectorizer used, so terms can be computed ahead
+        self._tfidf_analyzer = TfidfVectorizer(stop_words='english', ngram_range=(1, 2)).build_analyzer()
         self._load_spacy_model()
+        self._warm_up()
+    
+    def get_cached_extraction(self, method_name, text):
+        """Return a copy of a memoized extract_* result for text, or None if it isn't cached"""
+        key = (method_name, hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest())
+        with self._extraction_cache_lock:
+            if key not in self._extraction_cache:
+                return None
+            self._extraction_cache.move_to_end(key)
+            return copy.deepcopy(self._extraction_cache[key])
+    
+    def cache_extraction(self, method_name, text, result):
+        """Memoize an extract_* result for text (e.g. one loaded from the database)"""
+        key = (method_name, hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest())
+        with self._extraction_cache_lock:
+            self._extraction_cache[key] = result
+            self._extraction_cache.move_to_end(key)
+            if len(self._extraction_cache) > self.EXTRACTION_CACHE_SIZE:
+                self._extraction_cache.popitem(last=False)
     
     def _load_spacy_model(self):
         """Load spaCy model with fallback"""
+        self.nlp = _get_spacy_model()
+    
+    def _warm_up(self):
+        """Run each extractor once so the first request doesn't pay for model and regex start-up"""
+        sample = (
+            "Python developer with 3 years of experience in Flask and SQL. "
+            "Bachelor of Science in Computer Science. dev@example.com 555-123-4567"
+        )
         try:
-            self.nlp = spacy.load("en_core_web_sm")
-        except OSError:
-            logger.warning("spaCy model 'en_core_web_sm' not found. Using basic processing.")
-            self.nlp = None
+            self.extract_contact_info(sample)
+            self.extract_skills(sample)
+            self.extract_skills_deep(sample)
+            self.extract_experience(sample)
+            self.extract_education(sample)
+        except Exception as e:
+            logger.warning(f"Resume processor warm-up failed: {str(e)}")
     
     def _load_skills_database(self):
         """Load comprehensive skills database"""
@@ -79,6 +254,65 @@ class ResumeProcessor:
             ]
         }
     
+    def _build_skill_automaton(self):
+        """Build an Aho-Corasick automaton over the skills database (None if pyahocorasick is missing)"""
+        if ahocorasick is None:
+            logger.warning("pyahocorasick not installed. Falling back to regex skill matching.")
+            return None
+        
+        automaton = ahocorasick.Automaton()
+        order = 0
+        for category, skills in self.skills_database.items():
+            for skill in skills:
+                keyword = skill.lower()
+                # A skill listed under several categories keeps its first one, as the regex loop did
+                if keyword not in automaton:
+                    automaton.add_word(keyword, (order, skill, category))
+                order += 1
+        automaton.make_automaton()
+        return automaton
+    
+    def _build_skill_regex(self):
+        """
+        Fuse every database skill into one word-boundary alternation for the fallback matcher.
+
+        Longer skills are tried first at each position, and the lookahead lets finditer
+        report matches that overlap, so a single pass finds what per-skill searches did.
+        """
+        skill_order = {}
+        for category, skills in self.skills_database.items():
+            for skill in skills:
+                # A skill listed under several categories keeps its first one
+                skill_order.setdefault(skill.lower(), (len(skill_order), skill, category))
+        
+        alternation = '|'.join(re.escape(keyword) for keyword in sorted(skill_order, key=len, reverse=True))
+        return re.compile(r'\b(?=(' + alternation + r')\b)'), skill_order
+    
+    def _match_skills_with_regex(self, text_lower):
+        """Find database skills with the fused fallback regex, reported in database order"""
+        matches = {self._skill_order[match.group(1)] for match in self._skill_regex.finditer(text_lower)}
+        return [
+            {'skill': skill, 'category': category, 'confidence': 1.0}
+            for _, skill, category in sorted(matches)
+        ]
+    
+    def _match_skills_with_automaton(self, text_lower):
+        """Find database skills in a single pass, keeping the regex word-boundary semantics"""
+        matches = {}
+        for end, (order, skill, category) in self._skill_automaton.iter(text_lower):
+            if order in matches:
+                continue
+            start = end - len(skill) + 1
+            if _is_word_boundary(text_lower, start) and _is_word_boundary(text_lower, end + 1):
+                matches[order] = {
+                    'skill': skill,
+                    'category': category,
+                    'confidence': 1.0
+                }
+        
+        # Report skills in database order so results match the regex fallback
+        return [matches[order] for order in sorted(matches)]
+    
     def _load_education_keywords(self):
         """Load education-related keywords"""
         return {
@@ -98,10 +332,13 @@ class ResumeProcessor:
             ]
         }
     
-    def extract_text_from_file(self, file_path):
-        """Extract text from PDF or DOCX file"""
+    def extract_text_from_file(self, file_path, ext=None):
+        """Extract text from PDF or DOCX file (pass ext, e.g. 'PDF', to skip parsing the path)"""
         try:
-            file_ext = os.path.splitext(file_path)[1].lower()
+            if ext:
+                file_ext = '.' + ext.lower().lstrip('.')
+            else:
+                file_ext = os.path.splitext(file_path)[1].lower()
             
             if file_ext == '.pdf':
                 return self._extract_from_pdf(file_path)
@@ -114,98 +351,106 @@ class ResumeProcessor:
             logger.error(f"Error extracting text from {file_path}: {str(e)}")
             raise
     
-    def _extract_from_pdf(self, file_path):
-        """Extract text from PDF using PyMuPDF"""
+    def extract_text_from_stream(self, stream, file_ext):
+        """Extract text from an in-memory PDF or DOCX upload without touching disk"""
         try:
-            doc = fitz.open(file_path)
-            text = ""
+            file_ext = '.' + file_ext.lower().lstrip('.')
+            data = stream.read()
             
-            for page_num in range(doc.page_count):
-                page = doc[page_num]
-                text += page.get_text()
-            
-            doc.close()
+            if file_ext == '.pdf':
+                return self._extract_from_pdf(data)
+            elif file_ext in ['.docx', '.doc']:
+                return self._extract_from_docx(io.BytesIO(data))
+            else:
+                raise ValueError(f"Unsupported file format: {file_ext}")
+                
+        except Exception as e:
+            logger.error(f"Error extracting text from uploaded {file_ext} stream: {str(e)}")
+            raise
+    
+    def _extract_from_pdf(self, source):
+        """Extract text from PDF using PyMuPDF (source is a path or the raw file bytes)"""
+        try:
+            if isinstance(source, (bytes, bytearray)):
+                doc = fitz.open(stream=source, filetype='pdf')
+            else:
+                doc = fitz.open(source)
+            with doc:
+                text = "".join(page.get_text("text") for page in doc)
             return text.strip()
             
         except Exception as e:
             logger.error(f"Error extracting PDF text: {str(e)}")
             raise
     
-    def _extract_from_docx(self, file_path):
-        """Extract text from DOCX file"""
+    def _extract_from_docx(self, source):
+        """Extract text from DOCX file (source is a path or a file-like object)"""
         try:
-            # Try with python-docx first for better formatting
+            # Read paragraph text straight from word/document.xml, one paragraph per line
             try:
-                doc = Document(file_path)
-                text = []
-                for paragraph in doc.paragraphs:
-                    text.append(paragraph.text)
-                return '\n'.join(text).strip()
+                return '\n'.join(_iter_docx_paragraphs(source)).strip()
             except:
                 # Fallback to docx2txt
-                return docx2txt.process(file_path).strip()
+                if hasattr(source, 'seek'):
+                    source.seek(0)
+                return docx2txt.process(source).strip()
                 
         except Exception as e:
             logger.error(f"Error extracting DOCX text: {str(e)}")
             raise
     
+    @_cached_extraction
     def extract_contact_info(self, text):
         """Extract contact information from resume text"""
         contact_info = {}
         
         # Email extraction
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        emails = re.findall(email_pattern, text)
-        if emails:
-            contact_info['email'] = emails[0]
+        email = _EMAIL_RE.search(text)
+        if email:
+            contact_info['email'] = email.group(0)
         
         # Phone number extraction
-        phone_patterns = [
-            r'(\+\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}',
-            r'(\+\d{1,3}[-.\s]?)?\d{10}',
-            r'(\+\d{1,3}[-.\s]?)?\d{3}[-.\s]?\d{3}[-.\s]?\d{4}'
-        ]
-        
-        for pattern in phone_patterns:
-            phones = re.findall(pattern, text)
-            if phones:
-                contact_info['phone'] = phones[0] if isinstance(phones[0], str) else ''.join(phones[0])
-                break
+        phone = _PHONE_RE.search(text)
+        if phone:
+            contact_info['phone'] = phone.group(0)
         
         # LinkedIn profile
-        linkedin_pattern = r'linkedin\.com/in/[\w-]+'
-        linkedin = re.findall(linkedin_pattern, text, re.IGNORECASE)
+        linkedin = _LINKEDIN_RE.search(text)
         if linkedin:
-            contact_info['linkedin'] = f"https://{linkedin[0]}"
+            contact_info['linkedin'] = f"https://{linkedin.group(0)}"
         
         # GitHub profile
-        github_pattern = r'github\.com/[\w-]+'
-        github = re.findall(github_pattern, text, re.IGNORECASE)
+        github = _GITHUB_RE.search(text)
         if github:
-            contact_info['github'] = f"https://{github[0]}"
+            contact_info['github'] = f"https://{github.group(0)}"
         
         return contact_info
     
+    @_cached_extraction
     def extract_skills(self, text):
         """Extract skills from resume text"""
+        return self._extract_skills(text, use_spacy=not self.lazy_spacy)
+    
+    @_cached_extraction
+    def extract_skills_deep(self, text):
+        """Extract skills including spaCy NER matches; used for job descriptions"""
+        return self._extract_skills(text, use_spacy=True)
+    
+    def _extract_skills(self, text, use_spacy, ents=None):
+        """Match text against the skills database, optionally adding spaCy NER candidates
+
+        ents, if given, are entities already found by a batched nlp.pipe pass over text.
+        """
         text_lower = text.lower()
-        found_skills = []
         
-        # Search for skills in each category
-        for category, skills in self.skills_database.items():
-            for skill in skills:
-                # Use word boundaries to avoid partial matches
-                pattern = r'\b' + re.escape(skill.lower()) + r'\b'
-                if re.search(pattern, text_lower):
-                    found_skills.append({
-                        'skill': skill,
-                        'category': category,
-                        'confidence': 1.0
-                    })
+        if self._skill_automaton is not None:
+            found_skills = self._match_skills_with_automaton(text_lower)
+        else:
+            found_skills = self._match_skills_with_regex(text_lower)
         
         # Use spaCy for additional skill extraction if available
-        if self.nlp:
-            found_skills.extend(self._extract_skills_with_spacy(text))
+        if use_spacy and self.nlp:
+            found_skills.extend(self._extract_skills_with_spacy(text, ents))
         
         # Remove duplicates and sort by confidence
         unique_skills = {}
@@ -216,16 +461,17 @@ class ResumeProcessor:
         
         return list(unique_skills.values())
     
-    def _extract_skills_with_spacy(self, text):
+    def _extract_skills_with_spacy(self, text, ents=None):
         """Extract additional skills using spaCy NER"""
         if not self.nlp:
             return []
         
-        doc = self.nlp(text)
+        if ents is None:
+            ents = self.nlp(text).ents
         skills = []
         
         # Extract entities that might be skills
-        for ent in doc.ents:
+        for ent in ents:
             if ent.label_ in ['PRODUCT', 'ORG'] and len(ent.text) > 2:
                 # Check if it's a potential technical skill
                 if any(keyword in ent.text.lower() for keyword in ['tech', 'soft', 'program', 'develop']):
@@ -237,50 +483,45 @@ class ResumeProcessor:
         
         return skills
     
+    def _batch_spacy_entities(self, texts):
+        """Run spaCy NER over texts in one batched nlp.pipe pass; returns each text's entities in order"""
+        return [list(doc.ents) for doc in self.nlp.pipe(texts, batch_size=32)]
+    
+    def _batch_extract_skills(self, texts):
+        """extract_skills() for many texts, sending the uncached ones through spaCy as one batch"""
+        results = [self.get_cached_extraction('extract_skills', text) for text in texts]
+        uncached = [i for i, skills in enumerate(results) if skills is None]
+        entities = self._batch_spacy_entities([texts[i] for i in uncached])
+        for i, ents in zip(uncached, entities):
+            results[i] = self._extract_skills(texts[i], use_spacy=True, ents=ents)
+            self.cache_extraction('extract_skills', texts[i], copy.deepcopy(results[i]))
+        return results
+    
+    @_cached_extraction
     def extract_experience(self, text):
         """Extract years of experience from resume text"""
-        experience_patterns = [
-            r'(\d+)\+?\s*years?\s+(?:of\s+)?experience',
-            r'(\d+)\+?\s*years?\s+in',
-            r'experience\s*:?\s*(\d+)\+?\s*years?',
-            r'(\d+)\+?\s*years?\s+(?:working|professional)',
-        ]
-        
         years = []
-        for pattern in experience_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            years.extend([int(match) for match in matches])
-        
-        # Also look for date ranges
-        date_patterns = [
-            r'(\d{4})\s*[-–]\s*(\d{4})',
-            r'(\d{4})\s*[-–]\s*present',
-            r'(\d{4})\s*[-–]\s*current'
-        ]
-        
         current_year = datetime.now().year
-        for pattern in date_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for match in matches:
-                start_year = int(match[0])
-                end_year = current_year if match[1].lower() in ['present', 'current'] else int(match[1])
-                years.append(max(0, end_year - start_year))
+        for match in _EXPERIENCE_RE.finditer(text):
+            if match.group('start'):
+                # Date range; an open-ended one runs to the current year
+                end = match.group('end')
+                end_year = current_year if end.lower() in ['present', 'current'] else int(end)
+                years.append(max(0, end_year - int(match.group('start'))))
+            else:
+                years.append(int(match.group('years') or match.group('stated')))
         
         return max(years) if years else 0
     
+    @_cached_extraction
     def extract_education(self, text):
         """Extract education information from resume text"""
         education_info = []
         text_lower = text.lower()
         
         # Look for degree patterns
-        degree_patterns = [
-            r'(bachelor|master|phd|doctorate|associate|diploma|certificate|bs|ba|ms|ma|mba|btech|mtech|bsc|msc)\s+(?:of\s+|in\s+)?([a-z\s]+)',
-            r'(bachelor|master|phd|doctorate|associate|diploma|certificate|bs|ba|ms|ma|mba|btech|mtech|bsc|msc)(?:\s+degree)?(?:\s+in\s+([a-z\s]+))?',
-        ]
-        
-        for pattern in degree_patterns:
-            matches = re.findall(pattern, text_lower)
+        for pattern in _DEGREE_RES:
+            matches = pattern.findall(text_lower)
             for match in matches:
                 degree = match[0].strip()
                 field = match[1].strip() if len(match) > 1 and match[1] else 'Unknown'
@@ -311,7 +552,7 @@ class ResumeProcessor:
         
         return unique_education
     
-    def calculate_similarity_scores(self, resume_text, job_description, resume_skills=None, resume_experience=0, resume_education=None):
+    def calculate_similarity_scores(self, resume_text, job_description, resume_skills=None, resume_experience=0, resume_education=None, job_skills=None, job_experience=None, job_education=None, job_terms=None):
         """Calculate comprehensive similarity scores between resume and job description"""
         
         if resume_skills is None:
@@ -319,10 +560,17 @@ class ResumeProcessor:
         if resume_education is None:
             resume_education = self.extract_education(resume_text)
         
-        # Extract job requirements
-        job_skills = self.extract_skills(job_description)
-        job_experience = self.extract_experience(job_description)
-        job_education = self.extract_education(job_description)
+        # Extract job requirements (callers that already extracted the JD skills can pass them in)
+        if job_skills is None:
+            job_skills = self.extract_skills_deep(job_description)
+        if job_experience is None:
+            job_experience = self.extract_experience(job_description)
+        if job_education is None:
+            job_education = self.extract_education(job_description)
+        
+        # The JD's spaCy NER skills aren't in the skills database the resume is matched
+        # against, so look for them in the resume text before counting them as missing
+        resume_skills = self._add_ner_job_skills(resume_text, resume_skills, job_skills)
         
         # Calculate individual scores
         skills_score = self._calculate_skills_score(resume_skills, job_skills)
@@ -330,7 +578,7 @@ class ResumeProcessor:
         education_score = self._calculate_education_score(resume_education, job_education)
         
         # Calculate text similarity using TF-IDF
-        text_similarity = self._calculate_text_similarity(resume_text, job_description)
+        text_similarity = self._calculate_text_similarity(resume_text, job_description, job_terms)
         
         # Weighted overall score
         weights = {
@@ -362,6 +610,18 @@ class ResumeProcessor:
             'resume_skills': [skill['skill'] for skill in resume_skills]
         }
     
+    def _add_ner_job_skills(self, resume_text, resume_skills, job_skills):
+        """Return resume_skills plus the job's NER-only skills that appear in the resume text"""
+        resume_skill_names = set(skill['skill'].lower() for skill in resume_skills)
+        found = [
+            skill for skill in job_skills
+            # Database matches have confidence 1.0; NER candidates are lower
+            if skill.get('confidence', 1.0) < 1.0
+            and skill['skill'].lower() not in resume_skill_names
+            and re.search(r'(?<!\w)' + re.escape(skill['skill']) + r'(?!\w)', resume_text, re.IGNORECASE)
+        ]
+        return resume_skills + found if found else resume_skills
+    
     def _calculate_skills_score(self, resume_skills, job_skills):
         """Calculate skills matching score"""
         if not job_skills:
@@ -426,31 +686,9 @@ class ResumeProcessor:
         if not resume_education:
             return 0.3  # Some base score
         
-        # Extract degree levels for comparison
-        resume_levels = set()
-        job_levels = set()
-        
-        degree_hierarchy = {
-            'associate': 1, 'diploma': 1, 'certificate': 1,
-            'bachelor': 2, 'bs': 2, 'ba': 2, 'btech': 2, 'bsc': 2,
-            'master': 3, 'ms': 3, 'ma': 3, 'mba': 3, 'mtech': 3, 'msc': 3,
-            'phd': 4, 'doctorate': 4
-        }
-        
-        for edu in resume_education:
-            level = degree_hierarchy.get(edu['degree'].lower(), 1)
-            resume_levels.add(level)
-        
-        for edu in job_education:
-            level = degree_hierarchy.get(edu['degree'].lower(), 1)
-            job_levels.add(level)
-        
-        if not job_levels:
-            return 0.8
-        
         # Check if resume meets minimum education requirement
-        max_resume_level = max(resume_levels) if resume_levels else 0
-        min_job_level = min(job_levels)
+        max_resume_level = max(_DEGREE_HIERARCHY.get(edu['degree'].lower(), 1) for edu in resume_education)
+        min_job_level = min(_DEGREE_HIERARCHY.get(edu['degree'].lower(), 1) for edu in job_education)
         
         if max_resume_level >= min_job_level:
             return 1.0
@@ -458,17 +696,34 @@ class ResumeProcessor:
         # Partial credit based on level difference
         return max(0.3, max_resume_level / min_job_level) if min_job_level > 0 else 0.3
     
-    def _calculate_text_similarity(self, resume_text, job_description):
+    def get_text_terms(self, text):
+        """
+        Get the TF-IDF terms (unigrams and bigrams, stop words removed) of a text.
+
+        Memoized by content hash; used for job descriptions, which are compared
+        against every resume in a batch and resubmitted often.
+        """
+        terms = self.get_cached_extraction('tfidf_terms', text)
+        if terms is None:
+            terms = tuple(self._tfidf_analyzer(self._preprocess_text(text)))
+            self.cache_extraction('tfidf_terms', text, terms)
+        return terms
+    
+    def _calculate_text_similarity(self, resume_text, job_description, job_terms=None):
         """Calculate text similarity using TF-IDF and cosine similarity"""
         try:
-            # Preprocess texts
-            texts = [self._preprocess_text(resume_text), self._preprocess_text(job_description)]
+            # Tokenize the resume; the job description's terms usually come from the cache
+            if job_terms is None:
+                job_terms = self.get_text_terms(job_description)
+            texts = [
+                self._tfidf_analyzer(self._preprocess_text(resume_text)),
+                job_terms
+            ]
             
-            # Calculate TF-IDF vectors
+            # Calculate TF-IDF vectors over the pre-tokenized documents
             vectorizer = TfidfVectorizer(
+                analyzer=_precomputed_terms,
                 max_features=1000,
-                stop_words='english',
-                ngram_range=(1, 2),
                 min_df=1
             )
             
@@ -486,8 +741,8 @@ class ResumeProcessor:
     def _preprocess_text(self, text):
         """Preprocess text for similarity calculation"""
         # Remove special characters and extra whitespace
-        text = re.sub(r'[^\w\s]', ' ', text)
-        text = re.sub(r'\s+', ' ', text)
+        text = _NON_WORD_RE.sub(' ', text)
+        text = _WHITESPACE_RE.sub(' ', text)
         return text.lower().strip()
     
     def _analyze_skill_match(self, resume_skills, job_skills):
@@ -564,19 +819,43 @@ class ResumeProcessor:
         
         return suggestions[:5]  # Return top 5 suggestions
     
-    def rank_multiple_resumes(self, resume_data_list, job_description):
+    def rank_multiple_resumes(self, resume_data_list, job_description, job_skills=None):
         """Rank multiple resumes against a job description"""
         rankings = []
         
+        # The job description is the same for every resume, so extract its features once
+        if job_skills is None:
+            job_skills = self.extract_skills_deep(job_description)
+        job_experience = self.extract_experience(job_description)
+        job_education = self.extract_education(job_description)
+        job_terms = self.get_text_terms(job_description)
+        
+        resume_skills = [resume_data.get('skills') for resume_data in resume_data_list]
+        if self.nlp and not self.lazy_spacy:
+            # Resumes without pre-extracted skills go through spaCy in one nlp.pipe batch
+            # instead of one self.nlp() call each
+            pending = [
+                i for i, resume_data in enumerate(resume_data_list)
+                if resume_skills[i] is None and resume_data.get('content', resume_data.get('text'))
+            ]
+            if pending:
+                texts = [resume_data_list[i].get('content', resume_data_list[i].get('text')) for i in pending]
+                for i, skills in zip(pending, self._batch_extract_skills(texts)):
+                    resume_skills[i] = skills
+        
         for i, resume_data in enumerate(resume_data_list):
             try:
                 # Calculate scores for each resume
                 analysis = self.calculate_similarity_scores(
-                    resume_data['text'],
+                    resume_data.get('content', resume_data.get('text')),
                     job_description,
-                    resume_data.get('skills'),
+                    resume_skills[i],
                     resume_data.get('experience', 0),
-                    resume_data.get('education')
+                    resume_data.get('education'),
+                    job_skills,
+                    job_experience,
+                    job_education,
+                    job_terms
                 )
                 
                 rankings.append({
@@ -606,6 +885,14 @@ class ResumeProcessor:
                     'rank_position': 0
                 })
         
+        # Attach suggestions while each analysis is at hand so callers don't regenerate them
+        for ranking in rankings:
+            analysis = ranking['analysis']
+            analysis['improvements'] = self.generate_improvement_suggestions(analysis)
+            analysis['skill_gap_suggestions'] = self.generate_skill_gap_suggestions(
+                analysis['missing_skills'], analysis['matched_skills']
+            )
+        
         # Sort by overall score (descending)
         rankings.sort(key=lambda x: x['analysis']['overall_score'], reverse=True)
         
@@ -617,6 +904,19 @@ class ResumeProcessor:
     
     def export_analysis_to_dict(self, analysis_result, resume_filename, job_title="Job Position"):
         """Export analysis result to dictionary for reports"""
+        # rank_multiple_resumes() attaches suggestions already; only generate them if missing
+        if 'improvements' in analysis_result:
+            recommendations = analysis_result['improvements']
+        else:
+            recommendations = self.generate_improvement_suggestions(analysis_result)
+        if 'skill_gap_suggestions' in analysis_result:
+            skill_gap_suggestions = analysis_result['skill_gap_suggestions']
+        else:
+            skill_gap_suggestions = self.generate_skill_gap_suggestions(
+                analysis_result['missing_skills'],
+                analysis_result['matched_skills']
+            )
+        
         return {
             'resume_filename': resume_filename,
             'job_title': job_title,
@@ -634,11 +934,8 @@ class ResumeProcessor:
                 'total_resume_skills': len(analysis_result['resume_skills']),
                 'total_job_skills': len(analysis_result['job_skills'])
             },
-            'recommendations': self.generate_improvement_suggestions(analysis_result),
-            'skill_gap_suggestions': self.generate_skill_gap_suggestions(
-                analysis_result['missing_skills'],
-                analysis_result['matched_skills']
-            )
+            'recommendations': recommendations,
+            'skill_gap_suggestions': skill_gap_suggestions
         }
 
 # Utility functions for trend analysis and statistics